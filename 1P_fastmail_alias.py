@@ -1,33 +1,97 @@
 #!/usr/bin/env python3
 import os
 import json
+import time
+import hashlib
 import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import subprocess
-import requests
 import secrets
 import string
 import sys
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
-# Import our module_venv helper
+# Import our module_venv helper, which sits next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from module_venv import AutoVirtualEnvironment
 
-# Setup virtual environment with required packages
-auto_venv = AutoVirtualEnvironment(auto_packages=['requests', 'python-dotenv'])
+# Use the venv shared by the py-utils scripts, adding this script's packages to it
+auto_venv = AutoVirtualEnvironment(auto_packages=['requests'], shared=True)
 auto_venv.auto_switch()
 
-# Import dotenv after we're in the virtual environment
-try:
-    from dotenv import load_dotenv
-except ImportError:
-    print("Installing required packages...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "python-dotenv"])
-    from dotenv import load_dotenv
+# Places the .env file is looked for, in order: next to this script, then the working directory
+ENV_FILE_DIRS = (os.path.dirname(os.path.abspath(__file__)), os.getcwd())
 
-# Load environment variables from .env file
-load_dotenv()
+def find_env_file(name: str = ".env") -> Optional[str]:
+    """Find the first of ENV_FILE_DIRS containing the named file"""
+    for env_dir in ENV_FILE_DIRS:
+        path = os.path.join(env_dir, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def _parse_env_value(value: str) -> str:
+    """Strip quotes, or an inline ' # comment' from an unquoted value"""
+    if value[:1] in ("\"", "'"):
+        end = value.find(value[0], 1)
+        if end != -1:
+            return value[1:end]
+    comment = value.find(" #")
+    if comment != -1:
+        value = value[:comment]
+    return value.strip()
+
+@functools.lru_cache(maxsize=1)
+def _load_env_file() -> Dict[str, str]:
+    """Read KEY=VALUE pairs from the .env file (once per process)"""
+    values = {}
+    env_file = find_env_file()
+    if env_file is None:
+        return values
+    try:
+        with open(env_file) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#") or "=" not in line:
+                    continue
+                key, value = line.split("=", 1)
+                key = key.strip()
+                if key.startswith("export "):
+                    key = key[len("export "):].strip()
+                values[key] = _parse_env_value(value.strip())
+    except OSError:
+        pass
+    return values
+
+def get_env(name: str) -> Optional[str]:
+    """Get a setting from the environment, falling back to the .env file"""
+    if name in os.environ:
+        return os.environ[name]
+    return _load_env_file().get(name)
+
+# Cached Fastmail JMAP session, reused across runs while fresh
+SESSION_CACHE_FILE = Path.home() / ".cache" / "py-1p-fastmail" / "session.json"
+SESSION_CACHE_MAX_AGE = 24 * 60 * 60  # seconds
+
+@functools.lru_cache(maxsize=1)
+def get_op_version() -> str:
+    """Get the installed 1Password CLI version (checked once per process)"""
+    try:
+        result = subprocess.run(['op', '--version'], capture_output=True, check=True, text=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        raise RuntimeError("1Password CLI (op) not found. Please install it from https://1password.com/downloads/command-line/")
+    return result.stdout.strip()
+
+@functools.lru_cache(maxsize=1)
+def is_op_signed_in() -> bool:
+    """Check if the user is signed in to 1Password (checked once per process)"""
+    try:
+        subprocess.run(['op', 'account', 'list'], capture_output=True, check=True)
+        return True
+    except subprocess.CalledProcessError:
+        return False
 
 class OnePasswordClient:
     """Client for interacting with 1Password CLI"""
@@ -35,83 +99,170 @@ class OnePasswordClient:
     def __init__(self, dry_run=False):
         """Initialize the 1Password client"""
         # Verify op CLI is installed
-        self._check_op_installed()
+        get_op_version()
         self.dry_run = dry_run
     
-    def _check_op_installed(self):
-        """Check if the 1Password CLI is installed"""
-        try:
-            subprocess.run(['op', '--version'], capture_output=True, check=True)
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            raise RuntimeError("1Password CLI (op) not found. Please install it from https://1password.com/downloads/command-line/")
-    
     def is_signed_in(self) -> bool:
         """Check if the user is signed in to 1Password"""
-        try:
-            subprocess.run(['op', 'account', 'list'], capture_output=True, check=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        return is_op_signed_in()
+    
+    def _build_item_template(self, title: str, username: str, password: Optional[str] = None,
+                             url: Optional[str] = None, notes: Optional[str] = None,
+                             tags: Optional[list] = None) -> Dict[str, Any]:
+        """Build the JSON item template that op reads from stdin"""
+        fields = []
+        if username:
+            fields.append({"id": "username", "type": "STRING", "purpose": "USERNAME", "label": "username", "value": username})
+        if password:
+            fields.append({"id": "password", "type": "CONCEALED", "purpose": "PASSWORD", "label": "password", "value": password})
+        if notes:
+            fields.append({"id": "notesPlain", "type": "STRING", "purpose": "NOTES", "label": "notesPlain", "value": notes})
+        
+        return {
+            "title": title,
+            "category": "LOGIN",
+            "fields": fields,
+            "urls": [{"primary": True, "href": url}] if url else [],
+            "tags": tags or []
+        }
+    
+    def _mask_password(self, template: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a copy of an item template that is safe to print"""
+        return dict(template, fields=[
+            dict(field, value='********') if field["id"] == "password" else field
+            for field in template["fields"]
+        ])
+    
+    def _dry_run_response(self, title: str, vault: str, username: str, url: Optional[str]) -> Dict[str, Any]:
+        """Build a mock item response for dry runs"""
+        return {
+            "id": "dry-run-item-id",
+            "title": title,
+            "vault": {
+                "id": "dry-run-vault-id",
+                "name": vault
+            },
+            "category": "LOGIN",
+            "urls": [{"primary": True, "href": url}] if url else [],
+            "fields": [
+                {"id": "username", "type": "STRING", "purpose": "USERNAME", "label": "username", "value": username},
+                {"id": "password", "type": "CONCEALED", "purpose": "PASSWORD", "label": "password", "value": "********"}
+            ]
+        }
     
     def create_login_item(self, title: str, vault: str, username: str, password: Optional[str] = None, 
                          url: Optional[str] = None, notes: Optional[str] = None, tags: Optional[list] = None) -> Dict[str, Any]:
         """Create a new login item in 1Password"""
         
-        # Base command and arguments
-        cmd = ['op', 'item', 'create', '--category', 'login', '--title', title, '--vault', vault]
+        # The item is passed as a JSON template on stdin, which also keeps the
+        # password out of the process arguments
+        cmd = ['op', 'item', 'create', '--vault', vault, '--format=json']
+        template = self._build_item_template(title, username, password, url, notes, tags)
         
-        # Add optional fields
-        if username:
-            cmd.extend(['username', username])
+        if password is None:  # Generate password only if None (not empty string)
+            cmd.append('--generate-password')
         
-        if password:
-            cmd.extend(['password', password])
-        elif password is None:  # Generate password only if None (not empty string)
-            cmd.extend(['--generate-password'])
-            
-        if url:
-            cmd.extend(['--url', url])
-            
-        if notes:
-            cmd.extend(['--notes', notes])
-            
-        if tags:
-            for tag in tags:
-                cmd.extend(['--tags', tag])
+        cmd.append('-')
         
         # If dry run, just print the command (with password masked) and return a mock response
         if self.dry_run:
-            # Create a safe copy of the command for printing (mask the password)
-            safe_cmd = cmd.copy()
-            if password:
-                password_index = safe_cmd.index('password') + 1
-                safe_cmd[password_index] = '********'
+            # Batch mode calls this from several threads, so write both lines at once
+            print("[DRY RUN] Would execute command: " + " ".join(str(arg) for arg in cmd) + "\n"
+                  + "[DRY RUN] With item template: " + json.dumps(self._mask_password(template)) + "\n", end="")
             
-            print("[DRY RUN] Would execute command: " + " ".join(str(arg) for arg in safe_cmd))
-            
-            # Return a mock response
-            return {
-                "id": "dry-run-item-id",
-                "title": title,
-                "vault": {
-                    "id": "dry-run-vault-id",
-                    "name": vault
-                },
-                "category": "LOGIN",
-                "urls": [{"primary": True, "href": url}] if url else [],
-                "fields": [
-                    {"id": "username", "type": "STRING", "purpose": "USERNAME", "label": "username", "value": username},
-                    {"id": "password", "type": "CONCEALED", "purpose": "PASSWORD", "label": "password", "value": "********"}
-                ]
-            }
+            return self._dry_run_response(title, vault, username, url)
             
         # Otherwise, run the command
         try:
-            result = subprocess.run(cmd, capture_output=True, check=True, text=True)
+            result = subprocess.run(cmd, input=json.dumps(template), capture_output=True, check=True, text=True)
             return json.loads(result.stdout)
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Failed to create item in 1Password: {e.stderr}")
 
+class ConnectClient(OnePasswordClient):
+    """Client for creating 1Password items through a 1Password Connect server"""
+    
+    def __init__(self, host: str, token: str, dry_run=False):
+        """Initialize the Connect client"""
+        self.host = host.rstrip("/")
+        self.dry_run = dry_run
+        self._vault_ids = {}
+        
+        # Imported here so the script can start (and bootstrap its venv) without requests installed
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        # Reuse one keep-alive connection for every request to the server
+        self._http = requests.Session()
+        self._http.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {token}"
+        })
+        self._http.mount(self.host, HTTPAdapter(pool_connections=1, pool_maxsize=10))
+    
+    def close(self):
+        """Close the underlying HTTP session"""
+        self._http.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def is_signed_in(self) -> bool:
+        """Connect authenticates every request with its token"""
+        return True
+    
+    def _get_vault_id(self, vault: str) -> str:
+        """Look up a vault ID by name, treating unknown names as IDs"""
+        if vault not in self._vault_ids:
+            response = self._http.get(f"{self.host}/v1/vaults", params={"filter": f'name eq "{vault}"'})
+            
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to look up vault: {response.status_code} {response.text}")
+                
+            vaults = response.json()
+            self._vault_ids[vault] = vaults[0]["id"] if vaults else vault
+            
+        return self._vault_ids[vault]
+    
+    def create_login_item(self, title: str, vault: str, username: str, password: Optional[str] = None, 
+                         url: Optional[str] = None, notes: Optional[str] = None, tags: Optional[list] = None) -> Dict[str, Any]:
+        """Create a new login item in 1Password"""
+        item = self._build_item_template(title, username, password, url, notes, tags)
+        
+        if password is None:  # Generate password only if None (not empty string)
+            item["fields"].append({"id": "password", "type": "CONCEALED", "purpose": "PASSWORD", "label": "password", "generate": True})
+        
+        # If dry run, just print the request (with password masked) and return a mock response
+        if self.dry_run:
+            # Batch mode calls this from several threads, so write both lines at once
+            print(f"[DRY RUN] Would POST to {self.host}/v1/vaults/<{vault}>/items\n"
+                  + "[DRY RUN] With item: " + json.dumps(self._mask_password(item)) + "\n", end="")
+            
+            return self._dry_run_response(title, vault, username, url)
+        
+        vault_id = self._get_vault_id(vault)
+        item["vault"] = {"id": vault_id}
+        
+        response = self._http.post(f"{self.host}/v1/vaults/{vault_id}/items", json=item)
+        
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to create item in 1Password: {response.status_code} {response.text}")
+            
+        return response.json()
+
+def create_password_manager_client(dry_run=False) -> OnePasswordClient:
+    """Get a 1Password client, preferring Connect when it is configured"""
+    connect_host = get_env("OP_CONNECT_HOST")
+    connect_token = get_env("OP_CONNECT_TOKEN")
+    
+    if connect_host and connect_token:
+        return ConnectClient(connect_host, connect_token, dry_run=dry_run)
+        
+    return OnePasswordClient(dry_run=dry_run)
+
 class FastmailClient:
     """Client for interacting with Fastmail API to create masked emails"""
     
@@ -119,12 +270,31 @@ class FastmailClient:
         """Initialize the Fastmail client"""
         self.api_token = api_token
         self.account_id = account_id
+        # Only an account ID taken from the session follows a session refresh
+        self._account_id_from_session = account_id is None
         self.app_name = "py-1p-fastmail-alias"
         self.session_endpoint = "https://api.fastmail.com/jmap/session"
         self.dry_run = dry_run
         
+        # Imported here so the script can start (and bootstrap its venv) without requests installed
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        # Reuse one keep-alive connection for the session fetch and API calls
+        self._http = requests.Session()
+        self._http.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_token}"
+        })
+        self._http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        
         if not self.dry_run:
-            self.session_data = self._get_session()
+            # Use the cached session when fresh to skip the session round-trip
+            self.session_data = self._load_cached_session()
+            self._session_from_cache = self.session_data is not None
+            if not self._session_from_cache:
+                self.session_data = self._get_session()
+                self._save_cached_session(self.session_data)
             
             # If account_id is not provided, use the primary account
             if not self.account_id:
@@ -132,23 +302,70 @@ class FastmailClient:
         else:
             # For dry run, use mock session data
             self.session_data = {"apiUrl": "https://api.fastmail.com/jmap/api"}
+            self._session_from_cache = False
             if not self.account_id:
                 self.account_id = "dry-run-account-id"
     
+    def close(self):
+        """Close the underlying HTTP session"""
+        self._http.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _token_hash(self) -> str:
+        """Get a hash of the API token to key the session cache"""
+        return hashlib.sha256(self.api_token.encode()).hexdigest()
+    
+    def _load_cached_session(self) -> Optional[Dict[str, Any]]:
+        """Load session data from the cache if it is fresh and matches the token"""
+        try:
+            with open(SESSION_CACHE_FILE) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if cached.get("token_hash") != self._token_hash():
+            return None
+        if time.time() - cached.get("fetched_at", 0) > SESSION_CACHE_MAX_AGE:
+            return None
+            
+        return cached.get("session")
+    
+    def _save_cached_session(self, session_data: Dict[str, Any]):
+        """Save session data to the cache (best effort)"""
+        try:
+            SESSION_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(SESSION_CACHE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump({
+                    "token_hash": self._token_hash(),
+                    "fetched_at": time.time(),
+                    "session": session_data
+                }, f)
+        except OSError as e:
+            print(f"Warning: could not cache Fastmail session: {e}")
+    
     def _get_session(self) -> Dict[str, Any]:
         """Get session information from Fastmail API"""
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_token}"
-        }
-        
-        response = requests.get(self.session_endpoint, headers=headers)
+        response = self._http.get(self.session_endpoint)
         
         if response.status_code != 200:
             raise RuntimeError(f"Failed to get session: {response.status_code} {response.text}")
             
         return response.json()
     
+    def _refresh_session(self):
+        """Fetch a fresh session, replacing a cached one that may be stale"""
+        self.session_data = self._get_session()
+        self._session_from_cache = False
+        self._save_cached_session(self.session_data)
+        if self._account_id_from_session:
+            self.account_id = self._get_primary_account_id()
+    
     def _get_primary_account_id(self) -> str:
         """Get the primary account ID for masked email"""
         masked_email_capability = "https://www.fastmail.com/dev/maskedemail"
@@ -166,108 +383,234 @@ class FastmailClient:
                            description: Optional[str] = None,
                            prefix: Optional[str] = None) -> Dict[str, Any]:
         """Create a new masked email address"""
+        masked_email, error = self.create_masked_emails([
+            {"domain": domain, "description": description, "prefix": prefix}
+        ])[0]
+        if error:
+            raise RuntimeError(f"Failed to create masked email: {error}")
+        return masked_email
+    
+    def create_masked_emails(self, specs: List[Dict[str, Optional[str]]]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """Create several masked email addresses in a single API request
+        
+        Each spec may contain "domain", "description" and "prefix" keys.
+        Fastmail creates each address independently, so one failure does not
+        stop the others.
+        
+        Returns:
+            list: (masked_email, error) tuples in the same order as the specs,
+            with masked_email None and error set for addresses that were not created
+        """
         
         # If dry run, just print the request and return a mock response
         if self.dry_run:
-            print("[DRY RUN] Would create masked email with:")
-            print(f"  Account ID: {self.account_id}")
-            print(f"  Domain: {domain or 'any'}")
-            print(f"  Description: {description or 'none'}")
-            print(f"  Prefix: {prefix or 'none'}")
-            
-            # Generate a mock email address
-            mock_prefix = prefix or f"mock{secrets.token_hex(4)}"
-            mock_domain = domain or "fastmail.com"
-            mock_email = f"{mock_prefix}@{mock_domain}"
-            
-            # Return a mock response
-            return {
-                "id": "dry-run-email-id",
-                "email": mock_email,
-                "forDomain": domain or "",
-                "description": description or "",
-                "state": "enabled",
-                "createTime": "2023-01-01T00:00:00Z"
-            }
-        
-        # Set up the API request
-        request_data = {
-            "using": [
-                "urn:ietf:params:jmap:core",
-                "https://www.fastmail.com/dev/maskedemail"
-            ],
-            "methodCalls": [
-                [
-                    "MaskedEmail/set",
-                    {
-                        "accountId": self.account_id,
-                        "create": {
-                            "new": {
-                                "state": "enabled",
-                                "forDomain": domain or "",
-                                "description": description or "",
-                                "emailPrefix": prefix or "",
-                                "createdBy": self.app_name
-                            }
-                        }
-                    },
-                    "0"
-                ]
-            ]
-        }
+            results = []
+            for spec in specs:
+                domain = spec.get("domain")
+                description = spec.get("description")
+                prefix = spec.get("prefix")
+                
+                print("[DRY RUN] Would create masked email with:")
+                print(f"  Account ID: {self.account_id}")
+                print(f"  Domain: {domain or 'any'}")
+                print(f"  Description: {description or 'none'}")
+                print(f"  Prefix: {prefix or 'none'}")
+                
+                # Generate a mock email address
+                mock_prefix = prefix or f"mock{secrets.token_hex(4)}"
+                mock_domain = domain or "fastmail.com"
+                mock_email = f"{mock_prefix}@{mock_domain}"
+                
+                # Return a mock response
+                results.append(({
+                    "id": "dry-run-email-id",
+                    "email": mock_email,
+                    "forDomain": domain or "",
+                    "description": description or "",
+                    "state": "enabled",
+                    "createTime": "2023-01-01T00:00:00Z"
+                }, None))
+            return results
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_token}"
-        }
+        response = self._http.post(self._get_api_endpoint(), json=self._build_create_request(specs))
         
-        response = requests.post(self._get_api_endpoint(), json=request_data, headers=headers)
+        # A cached session may point at a stale endpoint or account. Those
+        # requests are rejected before anything is created, so only they are
+        # safe to send again, rebuilt from the refreshed session
+        if response.status_code in (401, 404) and self._session_from_cache:
+            self._refresh_session()
+            response = self._http.post(self._get_api_endpoint(), json=self._build_create_request(specs))
         
         if response.status_code != 200:
             raise RuntimeError(f"Failed to create masked email: {response.status_code} {response.text}")
             
         response_data = response.json()
         
-        # Parse the response to extract the new masked email
-        method_response = response_data.get("methodResponses", [])[0]
+        # Match each response to its spec by the call ID
+        method_responses = {
+            method_response[2]: method_response
+            for method_response in response_data.get("methodResponses", [])
+            if len(method_response) == 3
+        }
         
-        if method_response[0] != "MaskedEmail/set":
-            raise RuntimeError(f"Unexpected response from Fastmail API: {response_data}")
+        results = []
+        for i in range(len(specs)):
+            call_id = str(i)
+            method_response = method_responses.get(call_id)
+            if method_response is None:
+                results.append((None, f"no response from Fastmail API: {response_data}"))
+                continue
             
-        created = method_response[1].get("created", {})
-        
-        if not created or "new" not in created:
-            raise RuntimeError(f"Failed to create masked email: {response_data}")
+            name, arguments = method_response[0], method_response[1]
+            if name == "MaskedEmail/set" and call_id in (arguments.get("created") or {}):
+                results.append((arguments["created"][call_id], None))
+                continue
+            
+            # A method-level error, or a SetError for this creation
+            if name == "MaskedEmail/set":
+                error = (arguments.get("notCreated") or {}).get(call_id, arguments)
+            else:
+                error = arguments
+            results.append((None, self._format_error(error)))
             
-        return created["new"]
+        return results
+    
+    def _format_error(self, error: Dict[str, Any]) -> str:
+        """Describe a JMAP method error or SetError"""
+        error_type = error.get("type", "unknown error")
+        description = error.get("description")
+        return f"{error_type}: {description}" if description else error_type
+    
+    def _build_create_request(self, specs: List[Dict[str, Optional[str]]]) -> Dict[str, Any]:
+        """Build a JMAP request with one MaskedEmail/set call per spec
+        
+        Call i creates its address under the creation ID str(i).
+        """
+        method_calls = []
+        for i, spec in enumerate(specs):
+            method_calls.append([
+                "MaskedEmail/set",
+                {
+                    "accountId": self.account_id,
+                    "create": {
+                        str(i): {
+                            "state": "enabled",
+                            "forDomain": spec.get("domain") or "",
+                            "description": spec.get("description") or "",
+                            "emailPrefix": spec.get("prefix") or "",
+                            "createdBy": self.app_name
+                        }
+                    }
+                },
+                str(i)
+            ])
+        
+        return {
+            "using": [
+                "urn:ietf:params:jmap:core",
+                "https://www.fastmail.com/dev/maskedemail"
+            ],
+            "methodCalls": method_calls
+        }
+
+# Characters used for generated passwords
+PASSWORD_ALPHABET = (string.ascii_letters + string.digits + "!@#$%^&*()-_=+[]{}|;:,.<>?").encode()
+# Smallest all-ones bit mask covering the alphabet, for unbiased rejection sampling
+PASSWORD_MASK = (1 << len(PASSWORD_ALPHABET).bit_length()) - 1
 
 def generate_password(length: int = 24) -> str:
     """Generate a secure random password"""
-    alphabet = string.ascii_letters + string.digits + "!@#$%^&*()-_=+[]{}|;:,.<>?"
-    return ''.join(secrets.choice(alphabet) for _ in range(length))
+    alphabet_len = len(PASSWORD_ALPHABET)
+    password = bytearray()
+    while len(password) < length:
+        # Draw random bytes in bulk and keep those that land inside the alphabet
+        for b in secrets.token_bytes(length * 2):
+            index = b & PASSWORD_MASK
+            if index < alphabet_len:
+                password.append(PASSWORD_ALPHABET[index])
+                if len(password) == length:
+                    break
+    return password.decode()
 
 def get_default_tags() -> list:
     """Get default tags from environment variable"""
-    default_tags_str = os.getenv("DEFAULT_TAGS", "")
+    default_tags_str = get_env("DEFAULT_TAGS") or ""
     if not default_tags_str:
         return []
     return [tag.strip() for tag in default_tags_str.split(",") if tag.strip()]
 
-def main():
-    """Main function to create a masked email and store it in 1Password"""
+def merge_tags(default_tags: list, provided_tags: list) -> list:
+    """Merge default tags with provided tags, removing duplicates but keeping order"""
+    if not default_tags and not provided_tags:
+        return []
+    return list(dict.fromkeys((*default_tags, *provided_tags)))
+
+def build_notes(notes: Optional[str], masked_email: Dict[str, Any]) -> str:
+    """Build item notes with the masked email details appended"""
+    notes = notes or ""
+    notes += f"\nMasked Email Details:\n"
+    notes += f"Email: {masked_email.get('email')}\n"
+    notes += f"For domain: {masked_email.get('forDomain') or 'Any'}\n"
+    notes += f"Description: {masked_email.get('description') or 'None'}\n"
+    notes += f"Created: {masked_email.get('createTime') or 'Unknown'}\n"
+    return notes
+
+def create_many(specs: List[Dict[str, Any]], op_client: OnePasswordClient, fastmail_client: FastmailClient,
+                vault: str, default_tags: Optional[list] = None, max_workers: int = 10) -> List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[str]]]:
+    """Create a masked email and 1Password item for each spec
     
-    # Check if .env file exists, if not, create from template
-    env_file = Path(".env")
-    env_template = Path(".env.template")
+    Each spec may contain "title" (required), "domain", "description", "prefix",
+    "url", "notes" and "tags". All masked emails are created in one Fastmail
+    request, then the 1Password items are written concurrently. A failure for
+    one spec does not stop the others.
     
-    if not env_file.exists() and env_template.exists():
-        print(".env file not found. Please copy .env.template to .env and fill in your credentials.")
-        print("cp .env.template .env")
+    Returns:
+        list: (masked_email, item, error) tuples in the same order as the specs.
+        error is set if either step failed; masked_email is still set if the
+        address was created but its 1Password item was not.
+    """
+    if not specs:
+        return []
     
-    # Parse command line arguments
+    results = []
+    items = {}
+    for i, (spec, (masked_email, error)) in enumerate(zip(specs, fastmail_client.create_masked_emails(specs))):
+        email_address = masked_email.get("email") if masked_email else None
+        if masked_email and not email_address:
+            error = "Failed to get email address from masked email response"
+        results.append((masked_email, None, error))
+        if error:
+            continue
+        items[i] = {
+            "title": spec["title"],
+            "vault": vault,
+            "username": email_address,
+            "password": generate_password(),
+            "url": spec.get("url"),
+            "notes": build_notes(spec.get("notes"), masked_email),
+            "tags": merge_tags(default_tags or [], spec.get("tags") or [])
+        }
+    
+    def create_item(item):
+        try:
+            return op_client.create_login_item(**item), None
+        except Exception as e:
+            # Any failure only affects this item, so the created masked emails are still reported
+            return None, f"{type(e).__name__}: {e}"
+    
+    # Each op call is a separate process, so threads are enough to overlap them
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        for i, (item, error) in zip(items, executor.map(create_item, items.values())):
+            results[i] = (results[i][0], item, error)
+    
+    return results
+
+@functools.lru_cache(maxsize=1)
+def _get_parser() -> argparse.ArgumentParser:
+    """Build the command line argument parser (once per process)"""
     parser = argparse.ArgumentParser(description='Create a Fastmail masked email and store it in 1Password')
     parser.add_argument('--vault', help='1Password vault to store the item in (default: from .env)')
-    parser.add_argument('--title', required=True, help='Title for the 1Password item')
+    parser.add_argument('--title', help='Title for the 1Password item (required unless --batch is used)')
     parser.add_argument('--domain', help='Domain for the masked email (e.g., example.com)')
     parser.add_argument('--description', help='Description for the masked email')
     parser.add_argument('--prefix', help='Prefix for the masked email')
@@ -276,22 +619,47 @@ def main():
     parser.add_argument('--notes', help='Notes for the 1Password item')
     parser.add_argument('--fastmail-token', help='Fastmail API token')
     parser.add_argument('--fastmail-account', help='Fastmail account ID')
+    parser.add_argument('--batch', help='JSON file with a list of items to create (keys: title, domain, description, prefix, url, notes, tags)')
     parser.add_argument('--dry-run', action='store_true', help='Simulate the process without creating anything')
+    # Added by AutoVirtualEnvironment when the script re-executes itself
+    parser.add_argument('--venv-activated', action='store_true', help=argparse.SUPPRESS)
+    return parser
+
+def main(argv: Optional[List[str]] = None):
+    """Main function to create a masked email and store it in 1Password"""
     
-    args = parser.parse_args()
+    # Parse command line arguments
+    parser = _get_parser()
+    args = parser.parse_args(argv)
+    
+    # Check if .env file exists, unless the required settings are already provided
+    settings_provided = (
+        (args.fastmail_token or "FASTMAIL_TOKEN" in os.environ)
+        and (args.vault or "DEFAULT_VAULT" in os.environ)
+    )
+    if not settings_provided:
+        # Look where the settings are actually loaded from
+        env_template = find_env_file(".env.template")
+        
+        if find_env_file() is None and env_template:
+            print(".env file not found. Please copy .env.template to .env and fill in your credentials.")
+            print(f"cp {env_template} {os.path.join(os.path.dirname(env_template), '.env')}")
+    
+    if not args.title and not args.batch:
+        parser.error("--title is required unless --batch is used")
     
     # Get Fastmail API token from environment or argument
-    fastmail_token = args.fastmail_token or os.environ.get("FASTMAIL_TOKEN")
+    fastmail_token = args.fastmail_token or get_env("FASTMAIL_TOKEN")
     if not fastmail_token and not args.dry_run:
         raise RuntimeError("Fastmail API token not provided. Use --fastmail-token or set FASTMAIL_TOKEN in .env file")
     elif not fastmail_token and args.dry_run:
         fastmail_token = "dry-run-token"
     
     # Get Fastmail account ID from environment or argument
-    fastmail_account = args.fastmail_account or os.environ.get("FASTMAIL_ACCOUNT")
+    fastmail_account = args.fastmail_account or get_env("FASTMAIL_ACCOUNT")
     
     # Get default vault from environment if not provided
-    vault = args.vault or os.environ.get("DEFAULT_VAULT")
+    vault = args.vault or get_env("DEFAULT_VAULT")
     if not vault and not args.dry_run:
         raise RuntimeError("1Password vault not provided. Use --vault or set DEFAULT_VAULT in .env file")
     elif not vault and args.dry_run:
@@ -300,10 +668,10 @@ def main():
     # Merge default tags with provided tags
     default_tags = get_default_tags()
     provided_tags = args.tags or []
-    tags = list(set(default_tags + provided_tags))  # remove duplicates
+    tags = merge_tags(default_tags, provided_tags)
     
     # Create clients with dry run flag
-    op_client = OnePasswordClient(dry_run=args.dry_run)
+    op_client = create_password_manager_client(dry_run=args.dry_run)
     fastmail_client = FastmailClient(fastmail_token, fastmail_account, dry_run=args.dry_run)
     
     # Check if signed in to 1Password
@@ -314,13 +682,43 @@ def main():
     if args.dry_run:
         print("\n===== DRY RUN MODE - NO CHANGES WILL BE MADE =====\n")
     
+    # Batch mode: create every item from the batch file
+    if args.batch:
+        with open(args.batch) as f:
+            specs = json.load(f)
+        if not isinstance(specs, list) or not all(isinstance(spec, dict) and spec.get("title") for spec in specs):
+            raise RuntimeError("Batch file must contain a list of objects, each with a 'title'")
+        
+        print(f"{'[DRY RUN] Would create' if args.dry_run else 'Creating'} {len(specs)} masked email(s) and 1Password item(s) in vault '{vault}'")
+        with fastmail_client:
+            results = create_many(specs, op_client, fastmail_client, vault, default_tags=default_tags)
+        
+        failed = 0
+        for spec, (masked_email, item, error) in zip(specs, results):
+            if not error:
+                print(f"{'[DRY RUN] Would create' if args.dry_run else 'Created'} '{spec['title']}': {masked_email.get('email')} (Item ID: {item.get('id')})")
+                continue
+            failed += 1
+            if masked_email:
+                # The address exists in Fastmail, so say which one needs storing by hand
+                print(f"Created masked email {masked_email.get('email')} for '{spec['title']}' but not its 1Password item: {error}")
+            else:
+                print(f"Failed to create masked email for '{spec['title']}': {error}")
+        
+        if failed:
+            raise RuntimeError(f"{failed} of {len(specs)} item(s) could not be created")
+        if args.dry_run:
+            print("\nNo changes were made.")
+        return
+    
     # Create masked email
     print(f"{'[DRY RUN] Would create' if args.dry_run else 'Creating'} masked email for domain: {args.domain or 'any'}, description: {args.description or 'none'}")
-    masked_email = fastmail_client.create_masked_email(
-        domain=args.domain,
-        description=args.description,
-        prefix=args.prefix
-    )
+    with fastmail_client:
+        masked_email = fastmail_client.create_masked_email(
+            domain=args.domain,
+            description=args.description,
+            prefix=args.prefix
+        )
     
     email_address = masked_email.get("email")
     if not email_address:
@@ -334,12 +732,7 @@ def main():
         print(f"[DRY RUN] Would generate password: {'*' * len(password)}")
     
     # Create notes with masked email details
-    notes = args.notes or ""
-    notes += f"\nMasked Email Details:\n"
-    notes += f"Email: {email_address}\n"
-    notes += f"For domain: {masked_email.get('forDomain') or 'Any'}\n"
-    notes += f"Description: {masked_email.get('description') or 'None'}\n"
-    notes += f"Created: {masked_email.get('createTime') or 'Unknown'}\n"
+    notes = build_notes(args.notes, masked_email)
     
     # Create 1Password item
     print(f"{'[DRY RUN] Would create' if args.dry_run else 'Creating'} 1Password item '{args.title}' in vault '{vault}'")
@@ -1,91 +1,105 @@
 import os
 import math
+import glob
+import argparse
 import subprocess
 import platform
 import sys
 import shutil
-from pathlib import Path
-
-# Import the VirtualEnvironment classes from module_venv
-try:
-    # Try to import assuming script is run from the py-utils directory
-    from module_venv import VirtualEnvironment, AutoVirtualEnvironment
-except ImportError:
-    # Try to import using relative path if script is run from a different directory
-    try:
-        import importlib.util
-        
-        # Get the directory of the current script
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # Construct the path to module_venv.py
-        module_path = os.path.join(current_dir, "module_venv.py")
-        
-        if not os.path.exists(module_path):
-            raise FileNotFoundError(f"Cannot find module_venv.py at {module_path}")
-        
-        # Load the module
-        spec = importlib.util.spec_from_file_location("module_venv", module_path)
-        module_venv = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module_venv)
-        
-        # Get the VirtualEnvironment classes
-        VirtualEnvironment = module_venv.VirtualEnvironment
-        AutoVirtualEnvironment = module_venv.AutoVirtualEnvironment
-    except Exception as e:
-        print(f"Error importing VirtualEnvironment classes: {e}")
-        print("Please make sure module_venv.py is in the same directory as this script.")
-        sys.exit(1)
+from concurrent.futures import ThreadPoolExecutor
+
+# Import AutoVirtualEnvironment from module_venv, which sits next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from module_venv import AutoVirtualEnvironment
 
 # Define the required packages
-REQUIRED_PACKAGES = ["moviepy==1.0.3"]
+REQUIRED_PACKAGES = []
+
+# Audio codecs that can be copied out of a video without re-encoding,
+# mapped to the extension of the resulting audio file
+STREAM_COPY_CODECS = {"mp3": ".mp3", "aac": ".m4a"}
+
+# Audio files that are split on frame boundaries with ffmpeg
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.aac', '.wav', '.flac', '.ogg', '.opus')
+
+# Fraction of the maximum size to aim for when splitting audio by duration
+SEGMENT_SIZE_MARGIN = 0.95
+
+# Buffer size used when copying chunks without sendfile
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Maximum number of threads writing chunks at once
+MAX_WRITE_WORKERS = 8
+
+# sendfile only supports file-to-file copies on Linux
+USE_SENDFILE = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+def get_audio_codec(file_path):
+    """Get the codec name of the first audio stream using ffprobe."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "stream=codec_name", "-of", "csv=p=0", file_path],
+        capture_output=True, text=True
+    )
+    return result.stdout.strip()
 
 def extract_audio(file_path):
     """Extract audio from video files."""
-    # This function will be called after the venv is activated
-    import moviepy.editor as mp
-    
     # Check if the file is a video
     if file_path.endswith(('.mov', '.mp4', '.avi', '.mkv', '.wmv')):
+        if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+            print("Error: ffmpeg is required to extract audio. Please install it and try again.")
+            sys.exit(1)
+        
         # Extract audio from video
         print(f"Extracting audio from {file_path}...")
-        video = mp.VideoFileClip(file_path)
-        audio_file_path = f"{os.path.splitext(file_path)[0]}.mp3"
-        video.audio.write_audiofile(audio_file_path)
+        codec = get_audio_codec(file_path)
+        base_path = os.path.splitext(file_path)[0]
+        
+        # Copy the audio stream as-is when possible, otherwise encode to MP3
+        if codec in STREAM_COPY_CODECS:
+            audio_file_path = f"{base_path}{STREAM_COPY_CODECS[codec]}"
+            codec_args = ["-c:a", "copy"]
+        else:
+            audio_file_path = f"{base_path}.mp3"
+            codec_args = ["-c:a", "libmp3lame", "-q:a", "2"]
+        
+        subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", file_path, "-vn"] + codec_args + [audio_file_path], check=True)
         print(f"Audio extracted and saved to {audio_file_path}")
         return audio_file_path
     else:
         # File is already an audio file, so just return the path
         return file_path
 
-def split_file(file_path, max_size_mb):
-    """Split a file into chunks of specified maximum size."""
-    global output_dir
-    
-    # Convert max size from MB to bytes
-    max_size_bytes = int(max_size_mb * 1024 * 1024)
-    
-    # Get the total size of the file
-    total_size = os.path.getsize(file_path)
-    
-    # Calculate the number of chunks needed
-    num_chunks = math.ceil(total_size / max_size_bytes)
-    
-    # Open the file in binary mode
-    with open(file_path, 'rb') as f:
-        # Read the file in chunks
-        chunk_size = max_size_bytes
-        for i in range(num_chunks):
-            chunk = f.read(chunk_size)
-            # Write the chunk to a new file
-            base_name = os.path.basename(file_path)
-            name, ext = os.path.splitext(base_name)
-            chunk_file_path = os.path.join(output_dir, f'{name} - Part {i+1}{ext}')
-            with open(chunk_file_path, 'wb') as cf:
-                cf.write(chunk)
-            print(f'Wrote chunk {i+1} to {chunk_file_path}')
-    
-    # Copy the original file to the output directory with "- ORIGINAL" appended
+def copy_range(src, dst, offset, count):
+    """Copy count bytes starting at offset from one open file to another."""
+    if USE_SENDFILE:
+        # Kernel-side copy, the data never passes through Python
+        in_fd, out_fd = src.fileno(), dst.fileno()
+        while count > 0:
+            sent = os.sendfile(out_fd, in_fd, offset, count)
+            if sent == 0:
+                break
+            offset += sent
+            count -= sent
+    else:
+        # Read into one reusable buffer so no new bytes object is made per read
+        buf = memoryview(bytearray(min(COPY_BUFFER_SIZE, count)))
+        src.seek(offset)
+        while count > 0:
+            n = src.readinto(buf[:min(len(buf), count)])
+            if not n:
+                break
+            dst.write(buf[:n])
+            count -= n
+
+def write_chunk(file_path, chunk_file_path, offset, count):
+    """Write count bytes starting at offset of file_path to chunk_file_path."""
+    with open(file_path, 'rb') as f, open(chunk_file_path, 'wb') as cf:
+        copy_range(f, cf, offset, count)
+
+def move_original(file_path):
+    """Move the original file to the output directory with "- ORIGINAL" appended."""
     base_name = os.path.basename(file_path)
     name, ext = os.path.splitext(base_name)
     
@@ -99,28 +113,94 @@ def split_file(file_path, max_size_mb):
     shutil.move(file_path, dest_path)
     print(f'Moved original file to {dest_path}')
 
-def main():
-    """Main function to handle file selection and splitting."""
+def get_bit_rate(file_path):
+    """Get the overall bit rate of a media file in bits per second, or None."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=bit_rate", "-of", "csv=p=0", file_path],
+        capture_output=True, text=True
+    )
+    try:
+        return int(result.stdout.strip())
+    except ValueError:
+        return None
+
+def split_audio(file_path, max_size_mb):
+    """Split an audio file on frame boundaries so each part plays on its own.
+    
+    Returns:
+        bool: True if the file was split, False if ffmpeg could not be used
+    """
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        return False
+    
+    bit_rate = get_bit_rate(file_path)
+    if not bit_rate:
+        return False
+    
+    # Size segments by duration, leaving headroom for VBR and container overhead
+    max_size_bits = max_size_mb * 1024 * 1024 * 8
+    segment_time = max_size_bits * SEGMENT_SIZE_MARGIN / bit_rate
+    
+    name, ext = os.path.splitext(os.path.basename(file_path))
+    # ffmpeg expands %d itself, so escape any literal % in the file name
+    segment_pattern = os.path.join(output_dir, f"{name.replace('%', '%%')} - Part %d{ext.replace('%', '%%')}")
+    
+    print(f"Splitting {file_path} into {segment_time:.0f} second parts...")
+    result = subprocess.run([
+        "ffmpeg", "-v", "error", "-y", "-i", file_path,
+        "-f", "segment", "-segment_time", f"{segment_time:.3f}", "-segment_start_number", "1",
+        "-reset_timestamps", "1", "-map", "0:a", "-c", "copy", segment_pattern
+    ])
+    if result.returncode != 0:
+        print("ffmpeg could not split the file, falling back to a byte split.")
+        return False
+    
+    print(f'Wrote parts to {output_dir}')
+    move_original(file_path)
+    return True
+
+def split_file(file_path, max_size_mb):
+    """Split a file into chunks of specified maximum size."""
     global output_dir
     
-    # Get the home directory for venv path
-    home_dir = str(Path.home())
+    # Convert max size from MB to bytes
+    max_size_bytes = int(max_size_mb * 1024 * 1024)
     
-    # Create venv name for this specific script
-    venv_name = os.path.join(home_dir, "venv", "split_file_venv")
+    # Get the total size of the file
+    total_size = os.path.getsize(file_path)
     
-    # Setup auto virtual environment with required packages
-    auto_venv = AutoVirtualEnvironment(custom_name=venv_name, auto_packages=REQUIRED_PACKAGES)
+    # Calculate the number of chunks needed
+    num_chunks = math.ceil(total_size / max_size_bytes)
     
-    # Try to switch to the virtual environment with required packages
-    # This will create it if it doesn't exist and re-execute the script
-    auto_venv.auto_switch()
+    # Build the chunk file name prefix once, outside the loop
+    name, ext = os.path.splitext(os.path.basename(file_path))
+    chunk_path_prefix = os.path.join(output_dir, f'{name} - Part ')
     
-    # If we reach here, we should be in the virtual environment
-    print(f"Using Python interpreter: {sys.executable}")
+    # Work out where each chunk starts and how long it is
+    chunk_size = max_size_bytes
+    chunks = []
+    for i in range(num_chunks):
+        offset = i * chunk_size
+        count = min(chunk_size, total_size - offset)
+        chunk_file_path = f'{chunk_path_prefix}{i+1}{ext}'
+        chunks.append((chunk_file_path, offset, count))
     
+    # Write the chunks in parallel, each worker with its own file handles
+    max_workers = min(MAX_WRITE_WORKERS, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(write_chunk, file_path, *chunk) for chunk in chunks]
+        for i, (future, (chunk_file_path, _, _)) in enumerate(zip(futures, chunks)):
+            future.result()
+            print(f'Wrote chunk {i+1} to {chunk_file_path}')
+    
+    move_original(file_path)
+
+def select_file_interactively():
+    """Show the files in the current directory and let the user pick one."""
     # Get the list of files in the current directory, ignoring .DS_Store
-    files = [f for f in os.listdir('.') if os.path.isfile(f) and not f.startswith('.DS_Store') and not f.startswith('.')]
+    # (scandir reports file types from the directory listing, without a stat per file)
+    with os.scandir('.') as entries:
+        files = [entry.name for entry in entries if not entry.name.startswith('.') and entry.is_file()]
     
     # Print the list of files with numbers
     print("Select a file:")
@@ -139,7 +219,11 @@ def main():
             print("Invalid input. Please enter a number.")
     
     # Get the selected file path
-    file_path = files[selection - 1]
+    return files[selection - 1]
+
+def process_file(file_path, max_size_mb, raw=False):
+    """Extract audio if needed and split a file into its own output directory."""
+    global output_dir
     
     # Get the file name without extension
     file_name = os.path.splitext(os.path.basename(file_path))[0]
@@ -149,8 +233,9 @@ def main():
     if dir_name.endswith("- ORIGINAL"):
         dir_name = dir_name[:-10].strip()  # Remove "- ORIGINAL" and any trailing spaces
     
-    # Create a directory based on the file name (without "- ORIGINAL" suffix)
-    output_dir = dir_name
+    # Create a directory based on the file name (without "- ORIGINAL" suffix),
+    # next to the file being split
+    output_dir = os.path.join(os.path.dirname(file_path), dir_name)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
         print(f'Created directory: {output_dir}')
@@ -160,9 +245,60 @@ def main():
     # Extract audio if necessary
     file_path = extract_audio(file_path)
     
-    max_size_mb = float(input("Enter the maximum chunk size in MB (default: 9): ") or 9)
+    # Split audio on frame boundaries unless a raw byte split was requested
+    if raw or not file_path.lower().endswith(AUDIO_EXTENSIONS) or not split_audio(file_path, max_size_mb):
+        split_file(file_path, max_size_mb)
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Split files into chunks of a maximum size')
+    parser.add_argument('--file', nargs='+', help='File(s) or glob pattern(s) to split (default: choose interactively)')
+    parser.add_argument('--max-mb', type=float, help='Maximum chunk size in MB (default: 9)')
+    parser.add_argument('--batch', action='store_true', help='Never prompt; requires --file and uses the default chunk size unless --max-mb is given')
+    parser.add_argument('--raw', action='store_true', help='Always split into raw byte chunks, even for audio files')
+    # Added by AutoVirtualEnvironment when the script re-executes itself
+    parser.add_argument('--venv-activated', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def main():
+    """Main function to handle file selection and splitting."""
+    args = parse_args()
+    interactive = not args.batch and sys.stdin.isatty()
+    
+    if not args.file and not interactive:
+        print("Error: --file is required when running non-interactively.")
+        sys.exit(2)
+    
+    # Use the venv shared by the py-utils scripts, adding this script's packages to it
+    auto_venv = AutoVirtualEnvironment(auto_packages=REQUIRED_PACKAGES, shared=True)
+    
+    # Try to switch to the virtual environment with required packages
+    # This will create it if it doesn't exist and re-execute the script
+    auto_venv.auto_switch()
+    
+    # If we reach here, we should be in the virtual environment
+    print(f"Using Python interpreter: {sys.executable}")
+    
+    if args.file:
+        # Expand any glob patterns the shell did not expand
+        file_paths = []
+        for pattern in args.file:
+            file_paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    else:
+        file_paths = [select_file_interactively()]
+    
+    max_size_mb = args.max_mb
+    if max_size_mb is None:
+        if interactive:
+            max_size_mb = float(input("Enter the maximum chunk size in MB (default: 9): ") or 9)
+        else:
+            max_size_mb = 9
     
-    split_file(file_path, max_size_mb)
+    for file_path in file_paths:
+        if not os.path.isfile(file_path):
+            print(f"Skipping {file_path}: not a file")
+            continue
+        process_file(file_path, max_size_mb, raw=args.raw)
 
 if __name__ == "__main__":
     main()
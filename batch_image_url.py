@@ -1,48 +1,50 @@
 import os
+import functools
 import re
+import json
+import hashlib
 import sys
-from urllib.parse import urljoin
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-# Import the VirtualEnvironment classes from module_venv
-try:
-    # Try to import assuming script is run from the py-utils directory
-    from module_venv import VirtualEnvironment, AutoVirtualEnvironment
-except ImportError:
-    # Try to import using relative path if script is run from a different directory
-    try:
-        import importlib.util
-        
-        # Get the directory of the current script
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # Construct the path to module_venv.py
-        module_path = os.path.join(current_dir, "module_venv.py")
-        
-        if not os.path.exists(module_path):
-            raise FileNotFoundError(f"Cannot find module_venv.py at {module_path}")
-        
-        # Load the module
-        spec = importlib.util.spec_from_file_location("module_venv", module_path)
-        module_venv = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module_venv)
-        
-        # Get the VirtualEnvironment classes
-        VirtualEnvironment = module_venv.VirtualEnvironment
-        AutoVirtualEnvironment = module_venv.AutoVirtualEnvironment
-    except Exception as e:
-        print(f"Error importing VirtualEnvironment classes: {e}")
-        print("Please make sure module_venv.py is in the same directory as this script.")
-        sys.exit(1)
+# Import AutoVirtualEnvironment from module_venv, which sits next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from module_venv import AutoVirtualEnvironment
 
 # Define the required packages
 REQUIRED_PACKAGES = [
-    'beautifulsoup4',
-    'requests',
-    'selenium'
+    'selectolax',
+    'httpx[http2]',
+    'playwright'
 ]
 
+# Characters that are not allowed in folder names
+UNSAFE_FOLDER_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+
+# Separator between srcset candidates: a comma followed by whitespace or
+# directly after a descriptor (URLs themselves may contain commas)
+SRCSET_SPLIT_RE = re.compile(r',\s+|(?<=\d[wx]),')
+
+# Browser-like user agent for fetching pages
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Maximum number of images downloaded at the same time
+MAX_CONCURRENT_DOWNLOADS = 32
+
+# Size of the pieces an image is written to disk in
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# File in each download folder recording ETag/Last-Modified for each image URL
+DOWNLOAD_INDEX_NAME = '.download_index.json'
+
 # Define the common download directory path to be used across all scripts
+@functools.lru_cache(maxsize=1)
 def get_download_dir():
     """
     Get the common download directory path (~/Downloads/py-script-downloads).
@@ -54,140 +56,335 @@ def get_download_dir():
     # Get the user's home directory in a cross-platform way
     home_dir = Path.home()
     
-    # Create the path to Downloads/py-script-downloads
-    download_dir = home_dir / "Downloads" / "py-script-downloads"
-    
-    # Create the directory if it doesn't exist
-    if not download_dir.exists():
-        os.makedirs(download_dir, exist_ok=True)
-        print(f"Created download directory: {download_dir}")
-    
-    # Create script-specific subdirectory
-    script_dir = download_dir / "batch_images"
-    if not script_dir.exists():
-        os.makedirs(script_dir, exist_ok=True)
-        print(f"Created script directory: {script_dir}")
+    # Create the script-specific subdirectory of Downloads/py-script-downloads
+    script_dir = home_dir / "Downloads" / "py-script-downloads" / "batch_images"
+    os.makedirs(script_dir, exist_ok=True)
     
     return script_dir
 
-def create_folder(url):
+def create_folder(url, download_dir):
     """Create a folder named after the URL's title."""
     folder_name = os.path.basename(url.strip('/'))
-    folder_name = re.sub(r'[<>:"/\\|?*]', '', folder_name)
+    folder_name = UNSAFE_FOLDER_CHARS_RE.sub('', folder_name)
     
     # Create the folder within the downloads directory
-    download_path = os.path.join(get_download_dir(), folder_name)
+    download_path = os.path.join(download_dir, folder_name)
     os.makedirs(download_path, exist_ok=True)
     return download_path
 
-def get_page_source(url):
-    """Use Selenium to get the page source, including dynamically loaded content."""
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
+class PageFetcher:
+    """Fetch page sources with one headless Chromium instance reused across URLs."""
     
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Run in headless mode
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    def __init__(self):
+        """Initialize without starting the browser; it is started on first use."""
+        self.playwright = None
+        self.browser = None
     
-    try:
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.get(url)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "img"))
-        )
-        return driver.page_source
-    except Exception as e:
-        print(f"Error fetching page: {e}")
-        return None
-    finally:
-        driver.quit()
+    def _launch(self):
+        """Start Playwright and launch headless Chromium."""
+        from playwright.sync_api import sync_playwright
+        
+        if self.playwright is None:
+            self.playwright = sync_playwright().start()
+        return self.playwright.chromium.launch(headless=True)
+    
+    def _get_browser(self):
+        """Start the browser the first time it is needed."""
+        if self.browser is None:
+            try:
+                self.browser = self._launch()
+            except Exception:
+                # The pip package does not include the browser itself; fetch it once and retry
+                print("Installing Playwright's Chromium browser...")
+                subprocess.run([sys.executable, '-m', 'playwright', 'install', 'chromium'], check=True)
+                self.browser = self._launch()
+        return self.browser
+    
+    def fetch(self, url):
+        """Use Playwright to get the page source, including dynamically loaded content.
+        
+        Returns:
+            tuple: (page source, URL of the page after redirects), or None on failure
+        """
+        try:
+            # A fresh context per page keeps cookies and storage separate without relaunching
+            context = self._get_browser().new_context(user_agent=USER_AGENT)
+            try:
+                page = context.new_page()
+                page.goto(url, wait_until='networkidle', timeout=30000)
+                return page.content(), page.url
+            finally:
+                context.close()
+        except Exception as e:
+            print(f"Error fetching page: {e}")
+            return None
+    
+    def close(self):
+        """Shut down the browser and Playwright if they were started."""
+        if self.browser is not None:
+            self.browser.close()
+            self.browser = None
+        if self.playwright is not None:
+            self.playwright.stop()
+            self.playwright = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def pick_largest_srcset(srcset):
+    """Pick the URL with the largest width or pixel density descriptor from a srcset."""
+    best_url = None
+    best_rank = -1
+    for candidate in SRCSET_SPLIT_RE.split(srcset.strip()):
+        parts = candidate.split()
+        if not parts:
+            continue
+        src_url = parts[0]
+        descriptor = parts[1] if len(parts) > 1 else '1x'
+        # Rank widths directly and densities as a nominal width, e.g. 2x -> 2000
+        try:
+            if descriptor.endswith('w'):
+                rank = int(descriptor[:-1])
+            elif descriptor.endswith('x'):
+                rank = float(descriptor[:-1]) * 1000
+            else:
+                rank = 1000
+        except ValueError:
+            rank = 0
+        if rank > best_rank:
+            best_url, best_rank = src_url, rank
+    return best_url
 
 def extract_image_urls(page_source):
-    """Extract image URLs from the page source, prioritizing higher-quality images."""
-    from bs4 import BeautifulSoup
+    """Extract image URLs from the page source, prioritizing higher-quality images.
+    
+    page_source may be str or the raw response bytes, which Lexbor decodes itself.
+    """
+    from selectolax.lexbor import LexborHTMLParser
     
-    soup = BeautifulSoup(page_source, 'html.parser')
+    tree = LexborHTMLParser(page_source)
     image_urls = []
     
-    for img_tag in soup.find_all('img'):
+    for img_tag in tree.css('img'):
+        attributes = img_tag.attributes
         # Check if srcset is available (contains multiple image sources)
-        if img_tag.get('srcset'):
+        if attributes.get('srcset'):
             # Extract the highest quality image from srcset
-            srcset = img_tag['srcset']
-            image_url = None
-            # Split srcset into different sources and choose the largest one
-            sources = srcset.split(', ')
-            for src in sources:
-                src_url = src.split()[0]
-                if not image_url or len(src_url) > len(image_url):
-                    image_url = src_url
-            if image_url:
-                image_urls.append(image_url)
+            image_url = pick_largest_srcset(attributes['srcset'])
         else:
             # Fallback to the original src attribute
-            image_url = img_tag.get('src')
-            if image_url:
-                image_urls.append(image_url)
+            image_url = attributes.get('src')
+        
+        # Inline data: images have nothing to download
+        if image_url and not image_url.startswith('data:'):
+            image_urls.append(image_url)
                 
     return image_urls
 
-def download_image(img_url, folder_name):
-    """Download an image and save it to the specified folder."""
-    import requests
+def try_static(url):
+    """Extract image URLs from the server-rendered HTML, without a browser.
+    
+    Returns:
+        tuple: (image URLs, URL of the page after redirects); the list is empty
+        if none were found or the request failed
+    """
+    import httpx
     
     try:
-        response = requests.get(img_url, stream=True, timeout=10)
+        response = httpx.get(url, headers={'User-Agent': USER_AGENT}, timeout=10.0, follow_redirects=True)
         response.raise_for_status()
-        
-        # Extract the image file name
-        img_name = os.path.basename(urljoin(img_url, img_url))
+    except httpx.HTTPError as e:
+        print(f"Could not fetch static page ({e}), using the browser instead.")
+        return [], url
+    
+    return extract_image_urls(response.content), str(response.url)
+
+def create_client():
+    """Create an async HTTP/2 client that multiplexes downloads over shared connections."""
+    import httpx
+    
+    limits = httpx.Limits(max_connections=MAX_CONCURRENT_DOWNLOADS, max_keepalive_connections=MAX_CONCURRENT_DOWNLOADS)
+    return httpx.AsyncClient(
+        timeout=10.0,
+        follow_redirects=True,
+        transport=httpx.AsyncHTTPTransport(http2=True, limits=limits, retries=3)
+    )
+
+def load_download_index(folder_name):
+    """Load the cache validators recorded for previously downloaded images."""
+    try:
+        with open(os.path.join(folder_name, DOWNLOAD_INDEX_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_download_index(folder_name, index):
+    """Save the cache validators for downloaded images."""
+    with open(os.path.join(folder_name, DOWNLOAD_INDEX_NAME), 'w') as f:
+        json.dump(index, f, indent=2)
+
+def assign_file_names(image_urls):
+    """Pick a distinct file name for each image URL.
+    
+    Names come from the last part of the URL path. When that is shared by
+    several URLs (e.g. /a/x.jpg and /b/x.jpg, or thumb.php?id=1 and
+    thumb.php?id=2), each gets a short hash of its full URL appended, so
+    the names stay the same from one run to the next.
+    
+    Returns:
+        dict: File name for each URL
+    """
+    names = {img_url: urlparse(img_url).path.rsplit('/', 1)[-1] or 'index' for img_url in image_urls}
+    name_counts = {}
+    for name in names.values():
+        name_counts[name] = name_counts.get(name, 0) + 1
+    
+    for img_url, name in names.items():
+        if name_counts[name] > 1 or urlparse(img_url).query:
+            stem, ext = os.path.splitext(name)
+            url_hash = hashlib.sha1(img_url.encode()).hexdigest()[:8]
+            names[img_url] = f"{stem}_{url_hash}{ext}"
+    return names
+
+async def download_image(img_url, img_name, folder_name, client, index):
+    """Download an image and save it to the specified folder.
+    
+    Images already in the download index are requested conditionally, and
+    other files already on disk are skipped when a HEAD request reports the
+    same size, so unchanged images are not transferred again.
+    """
+    try:
         img_path = os.path.join(folder_name, img_name)
         
-        # Save the image
-        with open(img_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        headers = {}
+        cached = index.get(img_url)
+        if cached and os.path.exists(os.path.join(folder_name, cached['filename'])):
+            # Ask the server to skip the body if our copy is still current
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        elif os.path.exists(img_path):
+            # No validators recorded (e.g. downloaded by an older run), so compare sizes
+            head = await client.head(img_url)
+            content_length = head.headers.get('Content-Length')
+            if head.is_success and content_length and int(content_length) == os.path.getsize(img_path):
+                print(f"Already downloaded: {img_name}")
+                return True
+        
+        async with client.stream('GET', img_url, headers=headers) as response:
+            if response.status_code == 304:
+                print(f"Unchanged: {cached['filename']}")
+                return True
+            response.raise_for_status()
+            
+            # Save the image
+            with open(img_path, 'wb') as f:
+                async for chunk in response.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+            
+            index[img_url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'size': os.path.getsize(img_path),
+                'filename': img_name
+            }
         print(f"Downloaded: {img_name}")
         return True
     except Exception as e:
         print(f"Error downloading {img_url}: {e}")
         return False
 
-def download_images_from_url(url):
+async def download_images(image_urls, folder_name):
+    """Download all images concurrently, capped to avoid being throttled."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    index = load_download_index(folder_name)
+    # Named up front so no two concurrent downloads write the same file
+    img_names = assign_file_names(image_urls)
+    
+    async def download(i, img_url):
+        async with semaphore:
+            print(f"Attempting to download image {i}: {img_url}")
+            if await download_image(img_url, img_names[img_url], folder_name, client, index):
+                print(f"Successfully downloaded image {i}.")
+    
+    try:
+        async with create_client() as client:
+            await asyncio.gather(*(download(i, img_url) for i, img_url in enumerate(image_urls, start=1)))
+    finally:
+        save_download_index(folder_name, index)
+
+def download_with_img2dataset(image_urls, folder_name):
+    """Hand a large list of image URLs to img2dataset.
+    
+    Returns:
+        bool: True if img2dataset ran successfully
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as url_list:
+        url_list.write('\n'.join(image_urls))
+    
+    try:
+        result = subprocess.run([
+            'img2dataset', '--url_list', url_list.name, '--output_folder', folder_name,
+            '--processes_count', '8', '--thread_count', '32',
+            '--image_size', '0', '--resize_mode', 'no'
+        ])
+        return result.returncode == 0
+    finally:
+        os.remove(url_list.name)
+
+def download_images_from_url(url, page_fetcher, use_img2dataset=False):
     """Main function to download images from a given URL."""
-    folder_name = create_folder(url)
+    folder_name = create_folder(url, get_download_dir())
     
-    # Get the full page source with Selenium
-    page_source = get_page_source(url)
-    if not page_source:
-        print("Failed to fetch page source. Exiting.")
-        return
+    # Try the plain HTML first and only start a browser if it has no images
+    image_urls, page_url = try_static(url)
+    if not image_urls:
+        # Get the full page source with the browser
+        fetched = page_fetcher.fetch(url)
+        if not fetched:
+            print("Failed to fetch page source. Exiting.")
+            return
+        page_source, page_url = fetched
+        
+        # Extract image URLs
+        image_urls = extract_image_urls(page_source)
     
-    # Extract image URLs
-    image_urls = extract_image_urls(page_source)
+    # Resolve relative URLs against the page we ended up on after any redirects,
+    # dropping repeats of the same image but keeping page order
+    image_urls = list(dict.fromkeys(urljoin(page_url, img_url) for img_url in image_urls))
     print(f"Found {len(image_urls)} images to download.")
+    if not image_urls:
+        return
     
-    # Download each image
-    for i, img_url in enumerate(image_urls, start=1):
-        # Handle relative URLs
-        img_url = urljoin(url, img_url)
-        print(f"Attempting to download image {i}: {img_url}")
-        if download_image(img_url, folder_name):
-            print(f"Successfully downloaded image {i}.")
+    if use_img2dataset:
+        if download_with_img2dataset(image_urls, folder_name):
+            return
+        print("img2dataset failed, falling back to the built-in downloader.")
+    
+    # Once the browser has been used, Playwright's sync API keeps an event loop
+    # running on this thread, so the downloads get a loop of their own
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(asyncio.run, download_images(image_urls, folder_name)).result()
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Download all images from one or more web pages')
+    parser.add_argument('urls', nargs='*', help='Page URL(s) to download images from (default: prompt)')
+    parser.add_argument('--img2dataset', action='store_true',
+                        help='Use img2dataset (must be installed separately) for very large pages')
+    # Added by AutoVirtualEnvironment when the script re-executes itself
+    parser.add_argument('--venv-activated', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
 
 def main():
-    # Get the home directory for venv path
-    home_dir = str(Path.home())
+    args = parse_args()
     
-    # Create venv name for this specific script
-    venv_name = os.path.join(home_dir, "venv", "batch_image_venv")
-    
-    # Setup auto virtual environment with required packages
-    auto_venv = AutoVirtualEnvironment(custom_name=venv_name, auto_packages=REQUIRED_PACKAGES)
+    # Use the venv shared by the py-utils scripts, adding this script's packages to it
+    auto_venv = AutoVirtualEnvironment(auto_packages=REQUIRED_PACKAGES, shared=True)
     
     # Try to switch to the virtual environment with required packages
     # This will create it if it doesn't exist and re-execute the script
@@ -196,11 +393,23 @@ def main():
     # If we reach here, we should be in the virtual environment
     print(f"Using Python interpreter: {sys.executable}")
     
-    url = input("Enter the URL: ")
-    if not url:
-        print("Please provide a valid URL.")
-        return
-    download_images_from_url(url)
+    use_img2dataset = args.img2dataset
+    if use_img2dataset and not shutil.which('img2dataset'):
+        print("img2dataset not found on PATH (pip install img2dataset). Using the built-in downloader.")
+        use_img2dataset = False
+    
+    urls = args.urls
+    if not urls:
+        url = input("Enter the URL: ")
+        if not url:
+            print("Please provide a valid URL.")
+            return
+        urls = [url]
+    
+    # Share one browser across all the pages
+    with PageFetcher() as page_fetcher:
+        for url in urls:
+            download_images_from_url(url, page_fetcher, use_img2dataset=use_img2dataset)
 
 if __name__ == "__main__":
     main()
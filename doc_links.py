@@ -1,57 +1,39 @@
 #!/usr/bin/env python3
 import os
+import functools
+import re
 import sys
+import shutil
 import subprocess
 from pathlib import Path
 
-# Import the VirtualEnvironment classes from module_venv (in the same directory)
-try:
-    # Try to import assuming script is run from the py-utils directory
-    from module_venv import VirtualEnvironment, AutoVirtualEnvironment
-    print("Successfully imported VirtualEnvironment classes")
-except ImportError:
-    # Try to import using relative path if script is run from a different directory
-    try:
-        import importlib.util
-        
-        # Get the directory of the current script
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # Construct the path to module_venv.py
-        module_path = os.path.join(current_dir, "module_venv.py")
-        
-        if not os.path.exists(module_path):
-            raise FileNotFoundError(f"Cannot find module_venv.py at {module_path}")
-        
-        # Load the module
-        spec = importlib.util.spec_from_file_location("module_venv", module_path)
-        module_venv = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module_venv)
-        
-        # Get the VirtualEnvironment classes
-        VirtualEnvironment = module_venv.VirtualEnvironment
-        AutoVirtualEnvironment = module_venv.AutoVirtualEnvironment
-        print(f"Successfully imported VirtualEnvironment classes from {module_path}")
-    except Exception as e:
-        print(f"Error importing VirtualEnvironment classes: {e}")
-        print("Please make sure module_venv.py is in the same directory as this script.")
-        sys.exit(1)
+# Import AutoVirtualEnvironment from module_venv, which sits next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from module_venv import AutoVirtualEnvironment
+
+# Characters replaced when turning a URL into a directory name
+UNSAFE_DIRNAME_CHARS_RE = re.compile(r'[^\w\-\.]')
+
+# More permissive URL validation pattern
+URL_RE = re.compile(
+    r'^(https?://)?'  # http:// or https:// (optional)
+    r'(([a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9\-]*[a-zA-Z0-9])\.)*'  # subdomains
+    r'([a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9\-]*[a-zA-Z0-9])'  # domain name
+    r'(\.[a-zA-Z]{2,})'  # TLD (.com, .org, etc.)
+    r'(:[0-9]+)?'  # port (optional)
+    r'(/[-a-zA-Z0-9()@:%_\+.~#?&//=]*)?'  # path, query params (optional)
+    r'$'
+)
+
+# Number of parallel connections when downloading with wget2
+WGET2_THREADS = 8
 
 # Check if wget is installed
 def check_dependencies():
-    """Check if wget is installed on the system."""
-    try:
-        result = subprocess.run(
-            ["which", "wget"] if sys.platform != "win32" else ["where", "wget"],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode != 0:
-            return ["wget"]
-        return []
-    except Exception as e:
-        print(f"Error checking for wget: {e}")
+    """Check if wget (or wget2) is installed on the system."""
+    if shutil.which("wget") is None and shutil.which("wget2") is None:
         return ["wget"]
+    return []
 
 # Function to create a safe directory name from a URL
 def get_safe_dirname_from_url(url):
@@ -68,8 +50,7 @@ def get_safe_dirname_from_url(url):
         url = url.split('://', 1)[1]
     
     # Replace special characters with underscores
-    import re
-    safe_name = re.sub(r'[^\w\-\.]', '_', url)
+    safe_name = UNSAFE_DIRNAME_CHARS_RE.sub('_', url)
     
     # Remove trailing underscores
     safe_name = safe_name.rstrip('_')
@@ -81,6 +62,7 @@ def get_safe_dirname_from_url(url):
     return safe_name
 
 # Define the common download directory path to be used across all scripts
+@functools.lru_cache(maxsize=1)
 def get_download_dir():
     """
     Get the common download directory path (~/Downloads/py-script-downloads).
@@ -92,19 +74,9 @@ def get_download_dir():
     # Get the user's home directory in a cross-platform way
     home_dir = Path.home()
     
-    # Create the path to Downloads/py-script-downloads
-    download_dir = home_dir / "Downloads" / "py-script-downloads"
-    
-    # Create the directory if it doesn't exist
-    if not download_dir.exists():
-        os.makedirs(download_dir, exist_ok=True)
-        print(f"Created download directory: {download_dir}")
-    
-    # Create script-specific subdirectory
-    script_dir = download_dir / "doc_link downloads"
-    if not script_dir.exists():
-        os.makedirs(script_dir, exist_ok=True)
-        print(f"Created script directory: {script_dir}")
+    # Create the script-specific subdirectory of Downloads/py-script-downloads
+    script_dir = home_dir / "Downloads" / "py-script-downloads" / "doc_link downloads"
+    os.makedirs(script_dir, exist_ok=True)
     
     return script_dir
 
@@ -126,20 +98,19 @@ def download_documents(base_url):
     url_dirname = get_safe_dirname_from_url(base_url)
     url_specific_path = os.path.join(base_path, url_dirname)
     if not Path(url_specific_path).exists():
-        os.makedirs(url_specific_path)
+        os.makedirs(url_specific_path, exist_ok=True)
         print(f"Created URL-specific directory: {url_specific_path}")
 
     print(f"Starting download from {base_url}")
     print(f"Documents will be saved to: {url_specific_path}")
     
-    # Change to the download directory
-    original_dir = os.getcwd()
-    os.chdir(url_specific_path)
-    
     try:
+        # Prefer wget2, which fetches with several threads, over wget
+        downloader = "wget2" if shutil.which("wget2") else "wget"
+        
         # Construct the wget command
         wget_cmd = [
-            "wget",
+            downloader,
             "--recursive",  # Download recursively
             "--level=inf",  # No limit on recursion depth
             "--mirror",     # Mirror the website
@@ -150,12 +121,14 @@ def download_documents(base_url):
             "--random-wait",  # Add random delays between requests
             "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",  # Generic Chrome browser user agent
             "--no-check-certificate",  # Skip SSL certificate checks
-            "-e",  # Execute command
             "--timeout=10",  # Set timeout to avoid hanging
             "--tries=3",    # Number of retries
             "--wait=1",     # Wait 1 second between retrievals
+            f"--directory-prefix={url_specific_path}",  # Save under the URL's directory
             base_url
         ]
+        if downloader == "wget2":
+            wget_cmd[1:1] = [f"--max-threads={WGET2_THREADS}"]  # Parallel downloads
         
         print(f"Running command: {' '.join(wget_cmd)}")
         
@@ -168,21 +141,17 @@ def download_documents(base_url):
         
         # Check if the command was successful
         if process.returncode == 0:
-            print(f"wget completed successfully!")
+            print(f"{downloader} completed successfully!")
             print(f"All documents saved to: {url_specific_path}")
             return 0  # Success
         else:
-            print(f"wget error (code {process.returncode}):")
+            print(f"{downloader} error (code {process.returncode}):")
             print(process.stderr)
             return 1  # Failure
     
     except Exception as e:
         print(f"Error running wget: {e}")
         return 1  # Failure
-    
-    finally:
-        # Change back to the original directory
-        os.chdir(original_dir)
 
 # Function to validate URL format
 def is_valid_url(url):
@@ -194,25 +163,7 @@ def is_valid_url(url):
     Returns:
         bool: True if valid, False otherwise
     """
-    import re
-    try:
-        # More permissive URL validation pattern
-        pattern = re.compile(
-            r'^(https?://)?'  # http:// or https:// (optional)
-            r'(([a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9\-]*[a-zA-Z0-9])\.)*'  # subdomains
-            r'([a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9\-]*[a-zA-Z0-9])'  # domain name
-            r'(\.[a-zA-Z]{2,})'  # TLD (.com, .org, etc.)
-            r'(:[0-9]+)?'  # port (optional)
-            r'(/[-a-zA-Z0-9()@:%_\+.~#?&//=]*)?'  # path, query params (optional)
-            r'$'
-        )
-        
-        return bool(pattern.match(url))
-    except re.error:
-        # Fallback to a basic check in case the regex has issues
-        if '.' not in url:
-            return False
-        return url.startswith('http://') or url.startswith('https://') or url.startswith('www.')
+    return bool(URL_RE.match(url))
 
 # Function to get URL from user or command line
 def get_url_from_user():
@@ -255,14 +206,8 @@ def ensure_wget_installed():
     Returns True if wget is available, False otherwise.
     """
     try:
-        # Check if wget is installed
-        result = subprocess.run(
-            ["which", "wget"] if sys.platform != "win32" else ["where", "wget"],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode == 0:
+        # Check if wget (or wget2) is installed
+        if shutil.which("wget") or shutil.which("wget2"):
             # wget is installed
             return True
         
@@ -308,14 +253,8 @@ def ensure_wget_installed():
 
 # Example usage
 if __name__ == "__main__":
-    # Get the home directory for venv path
-    home_dir = str(Path.home())
-    
-    # Create venv name for this specific script
-    venv_name = os.path.join(home_dir, "venv", "doc_links_venv")
-    
-    # Try to switch to the virtual environment
-    auto_venv = AutoVirtualEnvironment(custom_name=venv_name)
+    # Use the venv shared by the py-utils scripts
+    auto_venv = AutoVirtualEnvironment(shared=True)
     auto_venv.auto_switch()
     
     # If we reach here, we should be in the virtual environment
@@ -2,9 +2,59 @@
 import os
 import venv
 import sys
+import re
 import subprocess
-import inspect
 import pathlib
+import glob
+import shutil
+import sysconfig
+import tempfile
+import zipfile
+import ensurepip
+
+# File inside each venv listing the package specs installed into it
+MANIFEST_NAME = '.pkg_manifest'
+
+# Venv shared by scripts that opt in with shared=True, holding the union of their packages
+SHARED_VENV_NAME = os.path.join(pathlib.Path.home(), 'venv', 'py_utils_venv')
+
+# Characters ending the project name in a requirement such as 'httpx[http2]' or 'yt-dlp==2025.2.19'
+REQUIREMENT_NAME_END_RE = re.compile(r'[\s\[<>=!~;@]')
+
+# Where the pip wheel bundled with Python is unpacked once, to seed new venvs
+PIP_CACHE_DIR = os.path.join(pathlib.Path.home(), '.cache', 'py-utils')
+
+# Launcher written to <venv>/bin/pip when pip is seeded from the cache
+PIP_SHIM = """#!{python}
+import sys
+from pip._internal.cli.main import main
+sys.exit(main())
+"""
+
+def get_cached_pip_dir():
+    """Unpack Python's bundled pip wheel into the cache, once per pip version.
+    
+    Returns:
+        str: Directory holding the unpacked pip, or None if no bundled wheel was found
+    """
+    wheels = glob.glob(os.path.join(os.path.dirname(ensurepip.__file__), '_bundled', 'pip-*.whl'))
+    if not wheels:
+        return None
+    
+    wheel = wheels[0]
+    pip_dir = os.path.join(PIP_CACHE_DIR, os.path.basename(wheel)[:-len('.whl')])
+    if not os.path.isdir(pip_dir):
+        os.makedirs(PIP_CACHE_DIR, exist_ok=True)
+        # Unpack next to the final location and rename, so a partial unpack is never used
+        tmp_dir = tempfile.mkdtemp(dir=PIP_CACHE_DIR)
+        with zipfile.ZipFile(wheel) as whl:
+            whl.extractall(tmp_dir)
+        try:
+            os.rename(tmp_dir, pip_dir)
+        except OSError:
+            # Another process unpacked it first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return pip_dir
 
 class VirtualEnvironment:
     """A class to create and manage Python virtual environments."""
@@ -22,29 +72,55 @@ class VirtualEnvironment:
             
             # Create virtual environment name with new pattern
             self.venv_name = f"venv-{current_dir}-{caller_filename}"
+        
+        self.manifest_path = os.path.join(self.venv_name, MANIFEST_NAME)
     
     def _get_caller_script_name(self):
         """Get the name of the script that called this class."""
-        try:
-            # Try to get the caller's filename from the stack
-            frame = inspect.stack()[2]
-            caller_path = frame.filename
-            return os.path.basename(caller_path)
-        except (IndexError, AttributeError):
-            # Fallback to the current running script
-            return os.path.basename(sys.argv[0])
+        # The running script (walking the call stack with inspect is slow)
+        return os.path.basename(sys.argv[0])
     
     def create(self):
         """Create a new virtual environment."""
         print(f"Creating virtual environment '{self.venv_name}'...")
-        venv.create(self.venv_name, with_pip=True)
+        
+        # Copying an unpacked pip is much faster than running ensurepip; Windows
+        # needs pip's .exe launchers, so it keeps using ensurepip
+        pip_dir = get_cached_pip_dir() if sys.platform != 'win32' else None
+        
+        # Symlink the interpreter instead of copying it (Windows needs copies).
+        # upgrade_deps (Python 3.9+) is left at its default of False, so venv
+        # never upgrades pip/setuptools over the network
+        builder = venv.EnvBuilder(
+            system_site_packages=False,
+            symlinks=(os.name != 'nt'),
+            with_pip=(pip_dir is None)
+        )
+        builder.create(self.venv_name)
+        if pip_dir is not None:
+            self._seed_pip(pip_dir)
         return self.venv_name
     
-    def install_packages(self, packages):
+    def _seed_pip(self, pip_dir):
+        """Copy the cached pip into the venv and add pip launchers, like virtualenv does."""
+        venv_dir = os.path.abspath(self.venv_name)
+        shutil.copytree(pip_dir, self.get_site_packages_path(), dirs_exist_ok=True)
+        
+        bin_dir = os.path.join(venv_dir, 'bin')
+        shim = PIP_SHIM.format(python=os.path.join(bin_dir, 'python'))
+        for name in ('pip', 'pip3', f'pip{sys.version_info.major}.{sys.version_info.minor}'):
+            shim_path = os.path.join(bin_dir, name)
+            with open(shim_path, 'w') as f:
+                f.write(shim)
+            os.chmod(shim_path, 0o755)
+    
+    def install_packages(self, packages, fast=True):
         """Install packages in the virtual environment.
         
         Args:
             packages (list): List of package names to install
+            fast (bool): Try a wheels-only install first, which skips resolving
+                and building source distributions. Defaults to True.
         """
         # Determine the pip path based on platform
         if sys.platform == 'win32':
@@ -53,7 +129,46 @@ class VirtualEnvironment:
             pip_path = os.path.join(self.venv_name, 'bin', 'pip')
         
         print(f"Installing packages: {', '.join(packages)}")
-        subprocess.check_call([pip_path, 'install'] + packages)
+        # Install everything in one pip run, skipping pip's self-update check
+        pip_cmd = [pip_path, 'install', '--disable-pip-version-check', '--no-input', '--require-virtualenv']
+        if fast:
+            try:
+                subprocess.check_call(pip_cmd + ['--only-binary=:all:'] + packages)
+                return
+            except subprocess.CalledProcessError:
+                print("Some packages have no wheel for this platform, allowing source builds...")
+        
+        # Prefer wheels so as little as possible has to be built from source
+        subprocess.check_call(pip_cmd + ['--prefer-binary'] + packages)
+    
+    @staticmethod
+    def _project_name(spec):
+        """Get the normalized project name from a requirement spec."""
+        return REQUIREMENT_NAME_END_RE.split(spec, 1)[0].lower().replace('_', '-')
+    
+    def read_manifest(self):
+        """Read the package specs recorded for this venv, keyed by project name."""
+        try:
+            with open(self.manifest_path) as f:
+                return {self._project_name(line): line for line in map(str.strip, f) if line}
+        except OSError:
+            return {}
+    
+    def is_current(self, packages):
+        """Check whether every package spec is already installed in the venv."""
+        installed = self.read_manifest()
+        return all(installed.get(self._project_name(spec)) == spec for spec in packages)
+    
+    def sync_packages(self, packages):
+        """Install the packages the venv does not have yet and record them in its manifest."""
+        installed = self.read_manifest()
+        missing = [spec for spec in packages if installed.get(self._project_name(spec)) != spec]
+        if missing:
+            self.install_packages(missing)
+        
+        installed.update((self._project_name(spec), spec) for spec in packages)
+        with open(self.manifest_path, 'w') as f:
+            f.write("\n".join(sorted(installed.values())) + "\n")
     
     def print_activation_instructions(self):
         """Print instructions for activating the virtual environment."""
@@ -74,13 +189,31 @@ class VirtualEnvironment:
             str: The name of the created virtual environment
         """
         self.create()
-        
-        if packages:
-            self.install_packages(packages)
-            
+        self.sync_packages(packages or [])
         self.print_activation_instructions()
         return self.venv_name
     
+    def get_site_packages_path(self):
+        """Get the path to the site-packages directory of the virtual environment."""
+        venv_dir = os.path.abspath(self.venv_name)
+        if 'venv' in sysconfig.get_scheme_names():
+            scheme = 'venv'
+        else:
+            scheme = 'nt' if os.name == 'nt' else 'posix_prefix'
+        return sysconfig.get_path('purelib', scheme, vars={'base': venv_dir, 'platbase': venv_dir})
+    
+    def get_python_version(self):
+        """Get the major.minor Python version the virtual environment was created with."""
+        try:
+            with open(os.path.join(self.venv_name, 'pyvenv.cfg')) as f:
+                for line in f:
+                    key, _, value = line.partition('=')
+                    if key.strip() == 'version':
+                        return tuple(int(part) for part in value.strip().split('.')[:2])
+        except (OSError, ValueError):
+            pass
+        return None
+    
     def get_python_path(self):
         """Get the path to the Python executable in the virtual environment."""
         if sys.platform == 'win32':
@@ -91,9 +224,13 @@ class VirtualEnvironment:
 class AutoVirtualEnvironment(VirtualEnvironment):
     """A class that automatically sets up and switches to a virtual environment."""
     
-    def __init__(self, custom_name=None, auto_packages=None):
-        """Initialize with optional custom name and packages to auto-install."""
-        super().__init__(custom_name)
+    def __init__(self, custom_name=None, auto_packages=None, shared=False):
+        """Initialize with optional custom name and packages to auto-install.
+        
+        With shared=True the script uses the venv shared by all py-utils
+        scripts, so it is only created once and each script adds its packages.
+        """
+        super().__init__(SHARED_VENV_NAME if shared else custom_name)
         self.auto_packages = auto_packages or []
         
     def auto_switch(self, required_packages=None):
@@ -111,7 +248,11 @@ class AutoVirtualEnvironment(VirtualEnvironment):
         venv_exists = os.path.exists(self.venv_name) and os.path.isdir(self.venv_name)
         
         # If we're in a virtual environment and it's the right one, we're done
-        if in_venv and (self.venv_name in sys.prefix or sys.prefix.endswith(self.venv_name)):
+        target = os.path.realpath(self.venv_name)
+        current = os.path.realpath(sys.prefix)
+        if in_venv and (current == target or current.startswith(target + os.sep)):
+            if not self.is_current(packages):
+                self.sync_packages(packages)
             print(f"Already using virtual environment: {self.venv_name}")
             return True
         
@@ -119,6 +260,10 @@ class AutoVirtualEnvironment(VirtualEnvironment):
         if not venv_exists:
             print(f"Virtual environment '{self.venv_name}' doesn't exist. Creating...")
             self.setup(packages=packages)
+        elif not self.is_current(packages):
+            # The script needs packages the venv was not set up with
+            print(f"Updating packages in virtual environment '{self.venv_name}'...")
+            self.sync_packages(packages)
         
         # Get the Python path in the virtual environment
         venv_python = self.get_python_path()
@@ -127,6 +272,12 @@ class AutoVirtualEnvironment(VirtualEnvironment):
             print(f"Error: Python executable not found at {venv_python}")
             return False
         
+        # A venv made from this same Python version can be entered without
+        # starting a new interpreter
+        if not in_venv and self.get_python_version() == sys.version_info[:2]:
+            self.activate_in_process(venv_python)
+            return True
+        
         # Add a flag to prevent infinite recursion
         if "--venv-activated" not in sys.argv:
             print(f"Switching to virtual environment: {self.venv_name}")
@@ -138,6 +289,11 @@ class AutoVirtualEnvironment(VirtualEnvironment):
             # Prepare args for re-execution
             new_args = [venv_python, abs_script_path] + sys.argv[1:] + ["--venv-activated"]
             
+            if sys.platform == 'win32':
+                # os.execv on Windows starts a new process and returns control to
+                # cmd.exe immediately, so run the script and pass on its exit code
+                sys.exit(subprocess.run(new_args).returncode)
+            
             # Re-execute the current script with the virtual environment Python
             os.execv(venv_python, new_args)
             # If execv succeeds, the code below won't be executed
@@ -145,6 +301,33 @@ class AutoVirtualEnvironment(VirtualEnvironment):
         # If we get here with the flag, we're running in the virtual environment
         return True
 
+    def activate_in_process(self, venv_python):
+        """Make the running interpreter use the venv's packages, like activating it.
+        
+        Args:
+            venv_python (str): Path to the venv's Python executable
+        """
+        import site
+        
+        print(f"Activating virtual environment in-process: {self.venv_name}")
+        
+        # Drop the base interpreter's site-packages, as a venv without
+        # system site packages would
+        base_site_packages = set(site.getsitepackages() + [site.getusersitepackages()])
+        sys.path[:] = [path for path in sys.path if path not in base_site_packages]
+        
+        # addsitedir also processes .pth files; keep its entries after the standard library
+        stdlib_path = list(sys.path)
+        site.addsitedir(self.get_site_packages_path())
+        sys.path[:] = stdlib_path + [path for path in sys.path if path not in stdlib_path]
+        
+        venv_dir = os.path.abspath(self.venv_name)
+        sys.prefix = sys.exec_prefix = venv_dir
+        # Child processes started with sys.executable should run in the venv too
+        sys.executable = venv_python
+        os.environ['VIRTUAL_ENV'] = venv_dir
+        os.environ['PATH'] = os.path.dirname(venv_python) + os.pathsep + os.environ.get('PATH', '')
+
 # Example usage when script is run directly
 if __name__ == "__main__":
     # Example of the regular VirtualEnvironment
@@ -155,9 +338,8 @@ if __name__ == "__main__":
     # Example of the AutoVirtualEnvironment
     print("\nExample of AutoVirtualEnvironment:")
     auto_venv = AutoVirtualEnvironment(auto_packages=['requests', 'beautifulsoup4'])
-    auto_venv.auto_switch()
     
-    # If we reach here in the virtual environment
-    if "--venv-activated" in sys.argv:
+    # If we reach here we are using the virtual environment
+    if auto_venv.auto_switch():
         print("Success! Running in the virtual environment.")
         print(f"Python path: {sys.executable}")
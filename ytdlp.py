@@ -1,45 +1,67 @@
 import os
+import re
+import glob
+import time
+import functools
+import shlex
+import shutil
+import queue
+import threading
+import argparse
 import subprocess
-import platform
+import importlib
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 import sys
 
-# Import the VirtualEnvironment classes from module_venv
-try:
-    # Try to import assuming script is run from the py-utils directory
-    from module_venv import VirtualEnvironment, AutoVirtualEnvironment
-except ImportError:
-    # Try to import using relative path if script is run from a different directory
-    try:
-        import importlib.util
-        
-        # Get the directory of the current script
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # Construct the path to module_venv.py
-        module_path = os.path.join(current_dir, "module_venv.py")
-        
-        if not os.path.exists(module_path):
-            raise FileNotFoundError(f"Cannot find module_venv.py at {module_path}")
-        
-        # Load the module
-        spec = importlib.util.spec_from_file_location("module_venv", module_path)
-        module_venv = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module_venv)
-        
-        # Get the VirtualEnvironment classes
-        VirtualEnvironment = module_venv.VirtualEnvironment
-        AutoVirtualEnvironment = module_venv.AutoVirtualEnvironment
-    except Exception as e:
-        print(f"Error importing VirtualEnvironment classes: {e}")
-        print("Please make sure module_venv.py is in the same directory as this script.")
-        sys.exit(1)
+# Import AutoVirtualEnvironment from module_venv, which sits next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from module_venv import AutoVirtualEnvironment
 
 # Define yt-dlp version
 YT_DLP_VERSION = "2025.2.19"  # You can update this to the latest version
 REQUIRED_PACKAGES = [f"yt-dlp=={YT_DLP_VERSION}"]
 
+# Default number of URLs downloaded at the same time
+DEFAULT_PARALLEL_DOWNLOADS = 4
+
+# aria2c arguments used with --aria2c: fetch each file over 16 parallel
+# connections, since single connections are often throttled
+ARIA2C_ARGS = ['-x', '16', '-s', '16', '-k', '1M', '--file-allocation=none']
+
+# yt-dlp output filename template, placed inside the download directory
+OUTTMPL_NAME = '%(title)s.%(ext)s'
+
+# Seconds per field of an HH:MM:SS trim time
+TIME_FIELD_SECONDS = (3600, 60, 1)
+
+# yt-dlp error messages for videos that can't be downloaded without special access
+MEMBERS_ONLY_ERROR_RE = re.compile(r'members-only content|private video|only available to members', re.IGNORECASE)
+SIGN_IN_ERROR_RE = re.compile(r'sign in to view', re.IGNORECASE)
+
+# Trims report their progress each time they pass another multiple of this percentage
+TRIM_PROGRESS_STEP = 25
+
+# Partial file (tmpfilename) of each download this session has started but not
+# finished, keyed by its final filename, so cancelling can delete exactly those
+PARTIAL_DOWNLOADS = {}
+PARTIAL_DOWNLOADS_LOCK = threading.Lock()
+
+# Seconds after cancelling downloads during which a second Ctrl+C quits the session
+QUIT_WINDOW = 2
+
+# Set while downloads are being cancelled; checked by yt-dlp's progress hook
+CANCEL_DOWNLOADS = threading.Event()
+
+# Serializes output from the download threads so their lines don't interleave
+PRINT_LOCK = threading.Lock()
+
+# Accepted URL forms: a full http(s) URL, or a bare www. or YouTube address
+# including subdomains such as m.youtube.com and music.youtube.com
+URL_RE = re.compile(r'(?:https?://|www\.|(?:[\w-]+\.)*(?:youtube\.com|youtu\.be)\b)', re.IGNORECASE)
+
 # Define the common download directory path to be used across all scripts
+@functools.lru_cache(maxsize=1)
 def get_download_dir():
     """
     Get the common download directory path (~/Downloads/py-script-downloads).
@@ -51,32 +73,379 @@ def get_download_dir():
     # Get the user's home directory in a cross-platform way
     home_dir = Path.home()
     
-    # Create the path to Downloads/py-script-downloads
-    download_dir = home_dir / "Downloads" / "py-script-downloads"
+    # Create the script-specific subdirectory of Downloads/py-script-downloads
+    script_dir = home_dir / "Downloads" / "py-script-downloads" / "yt-dlp downloads"
+    script_dir.mkdir(parents=True, exist_ok=True)
     
-    # Create the directory if it doesn't exist
-    if not download_dir.exists():
-        os.makedirs(download_dir, exist_ok=True)
-        print(f"Created download directory: {download_dir}")
+    return script_dir
+
+def build_ydl_opts(output_dir, is_audio_only, verbose=False, parallel=False, thumbnail=False, aria2c=False):
+    """Build the yt-dlp options for the chosen download type.
     
-    # Create script-specific subdirectory
-    script_dir = download_dir / "yt-dlp downloads"
-    if not script_dir.exists():
-        os.makedirs(script_dir, exist_ok=True)
-        print(f"Created script directory: {script_dir}")
+    Args:
+        verbose (bool): Print yt-dlp's debug output
+        parallel (bool): Several downloads share the terminal, so hide the progress bars
+        thumbnail (bool): Embed the thumbnail in downloaded videos
+        aria2c (bool): Let aria2c do the transfers. yt-dlp gets no progress
+            updates from it, so its downloads can't be stopped or cleaned up on cancel
+    """
+    ydl_opts = build_format_opts(output_dir, is_audio_only, thumbnail)
+    ydl_opts['verbose'] = verbose
+    ydl_opts['noprogress'] = parallel
+    ydl_opts['progress_hooks'] = [track_download]
     
-    return script_dir
+    if not aria2c:
+        return ydl_opts
+    if shutil.which('aria2c'):
+        ydl_opts['external_downloader'] = {'default': 'aria2c'}
+        ydl_opts['external_downloader_args'] = {'aria2c': ARIA2C_ARGS}
+    else:
+        print("aria2c not found, using yt-dlp's built-in downloader.")
+    return ydl_opts
+
+def build_format_opts(output_dir, is_audio_only, thumbnail=False):
+    """Build the format and post-processing options for the chosen download type."""
+    outtmpl = str(output_dir / OUTTMPL_NAME)
+    if is_audio_only:
+        # Audio-only options
+        return {
+            'format': 'bestaudio/best',
+            'outtmpl': outtmpl,
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }, {
+                'key': 'FFmpegMetadata'  # Add metadata to the audio file
+            }],
+            'no_overwrites': True,
+            'ignoreerrors': True
+        }
+    
+    # Video options
+    postprocessors = [
+        {'key': 'FFmpegVideoConvertor', 'preferedformat': 'mp4'},  # Force MP4 conversion
+        {'key': 'FFmpegMetadata'},  # Add metadata to the video file
+    ]
+    if thumbnail:
+        # Embed thumbnail in the video file; yt-dlp skips both steps for videos without one
+        postprocessors.insert(1, {'key': 'EmbedThumbnail'})
+    return {
+        'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',  # Prefer MP4 format
+        'merge_output_format': 'mp4',
+        'outtmpl': outtmpl,  # Set output template to save in Downloads folder
+        'embed_subs': True,
+        'writethumbnail': thumbnail,
+        'postprocessors': postprocessors,
+        'no_overwrites': True,
+        'ignoreerrors': True
+    }
+
+def track_download(status):
+    """yt-dlp progress hook that records partial files and stops the download once the user cancels."""
+    filename = status.get('filename')
+    if filename:
+        with PARTIAL_DOWNLOADS_LOCK:
+            # Only 'downloading' updates carry tmpfilename; 'finished' and 'error' just name the file
+            if status['status'] == 'downloading' and status.get('tmpfilename'):
+                PARTIAL_DOWNLOADS[filename] = status['tmpfilename']
+            elif status['status'] != 'downloading':
+                PARTIAL_DOWNLOADS.pop(filename, None)
+    if CANCEL_DOWNLOADS.is_set():
+        from yt_dlp.utils import DownloadCancelled
+        raise DownloadCancelled()
+
+class YoutubeDLPool:
+    """Give each download thread its own YoutubeDL, reused for every URL that thread handles.
+    
+    A YoutubeDL instance is not safe to share between threads, but creating one
+    per URL repeats the extractor and connection setup.
+    """
+    
+    def __init__(self, ydl_opts):
+        """Initialize without creating any YoutubeDL instances yet."""
+        self.ydl_opts = ydl_opts
+        self._local = threading.local()
+        self._instances = []
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """Get the calling thread's YoutubeDL, creating it on first use."""
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            import yt_dlp
+            
+            ydl = yt_dlp.YoutubeDL(self.ydl_opts)
+            self._local.ydl = ydl
+            with self._lock:
+                self._instances.append(ydl)
+        return ydl
+    
+    def close(self):
+        """Close every YoutubeDL that was created."""
+        with self._lock:
+            for ydl in self._instances:
+                ydl.close()
+            self._instances.clear()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def log(label, message):
+    """Print a message from a download thread, prefixed with the label of its URL."""
+    with PRINT_LOCK:
+        print(f"{label} {message}")
+
+def download_url(url, label, ydl_pool, output_dir):
+    """Download one URL in a worker thread.
+    
+    Returns:
+        tuple: (info dict, path of the downloaded file or None), or None if the download failed
+    """
+    from yt_dlp.utils import DownloadCancelled, DownloadError
+    
+    log(label, f"Processing: {url}")
+    
+    # Run yt-dlp with the specified options
+    try:
+        log(label, "Attempting to download...")
+        log(label, f"Download will be saved to: {output_dir}")
+        
+        # Extract and download in one pass, so the page is only fetched once
+        info = ydl_pool.get().extract_info(url, download=True)
+        if info is None:
+            if not CANCEL_DOWNLOADS.is_set():
+                # With ignoreerrors yt-dlp reports the error itself and returns nothing
+                log(label, "Download failed, see the error above.")
+            return None
+        log(label, f"Video title: {info.get('title', 'Unknown')}")
+        log(label, f"Video duration: {info.get('duration', 'Unknown')} seconds")
+    except DownloadCancelled:
+        log(label, "Download cancelled.")
+        return None
+    except DownloadError as e:
+        message = str(e)
+        log(label, f"Error downloading video: {message}")
+        if MEMBERS_ONLY_ERROR_RE.search(message):
+            log(label, "This appears to be a members-only video which requires special access.")
+            log(label, "Unfortunately this content cannot be downloaded with this tool.")
+        elif SIGN_IN_ERROR_RE.search(message):
+            log(label, "This video requires you to be signed in to view.")
+            log(label, "Unfortunately this content cannot be downloaded with this tool.")
+        return None
+    except Exception as e:
+        log(label, f"Unexpected error during download: {e}")
+        log(label, f"Error type: {type(e).__name__}")
+        return None
+    
+    # yt-dlp reports where each downloaded file ended up (after post-processing)
+    try:
+        output_file = info['requested_downloads'][0]['filepath']
+    except (KeyError, IndexError):
+        # e.g. playlists, whose files are listed per entry
+        log(label, "yt-dlp did not report the output file, so it can't be trimmed.")
+        output_file = None
+    return info, output_file
+
+def cancel_downloads(futures):
+    """Stop the running downloads and delete the partial files they leave behind.
+    
+    Returns:
+        bool: True if the user pressed Ctrl+C again within QUIT_WINDOW seconds
+    """
+    # Queued downloads are dropped; running ones stop at their next progress update
+    CANCEL_DOWNLOADS.set()
+    for future in futures:
+        future.cancel()
+    
+    print(f"\nCancelling downloads. Press Ctrl+C again within {QUIT_WINDOW} seconds to quit.")
+    interrupted_at = time.monotonic()
+    quit_session = False
+    try:
+        wait(futures)
+        time.sleep(max(0, interrupted_at + QUIT_WINDOW - time.monotonic()))
+    except KeyboardInterrupt:
+        quit_session = time.monotonic() - interrupted_at < QUIT_WINDOW
+        wait(futures)
+    CANCEL_DOWNLOADS.clear()
+    
+    # Only this session's unfinished downloads: the .part file, its fragments
+    # and yt-dlp's fragment resume state
+    with PARTIAL_DOWNLOADS_LOCK:
+        partial_downloads = list(PARTIAL_DOWNLOADS.items())
+        PARTIAL_DOWNLOADS.clear()
+    for filename, tmpfilename in partial_downloads:
+        paths = [tmpfilename, f"{filename}.ytdl"]
+        paths += glob.glob(f"{glob.escape(tmpfilename)}-Frag*")
+        for path in paths:
+            if path != filename:
+                Path(path).unlink(missing_ok=True)
+    return quit_session
+
+def parse_time(t):
+    """Parse HH:MM:SS, MM:SS or plain seconds into seconds, or None if blank or invalid."""
+    if not t:
+        return None
+    parts = t.split(":")
+    if len(parts) > len(TIME_FIELD_SECONDS):
+        return None
+    try:
+        # Line the fields up with the last (seconds-based) multipliers
+        return sum(int(part) * seconds for part, seconds in zip(parts, TIME_FIELD_SECONDS[-len(parts):]))
+    except ValueError:
+        return None
+
+def ask_trim(info, output_file):
+    """Ask for optional trim times for a download.
+    
+    Returns:
+        tuple: (start_sec, end_sec), either of which may be None, or None to keep the full download
+    """
+    duration = info.get('duration', None)
+    
+    # Prompt for trim times (after download)
+    if duration:
+        if duration >= 3600:
+            time_format = 'HH:MM:SS'
+        else:
+            time_format = 'MM:SS'
+    else:
+        time_format = 'MM:SS'
+    print(f"\n✨ Optional: Trim your download of '{info.get('title', output_file)}'! ✨")
+    print(f"Enter start and end times in {time_format} format (leave blank for full length). Example: 00:30 for 30 seconds, 01:15:00 for 1 hour 15 min.")
+    trim_start = input("⏩ Start at (leave blank for start): ").strip()
+    trim_end = input("⏹️ End at (leave blank for end): ").strip()
+    
+    start_sec = parse_time(trim_start)
+    end_sec = parse_time(trim_end)
+    
+    if start_sec is None and end_sec is None:
+        print("No trimming selected. Keeping full download.")
+        return None
+    if not output_file or not os.path.exists(output_file):
+        print(f"❌ Could not find the downloaded file to trim! Please check your downloads folder. (File: {output_file})")
+        return None
+    return start_sec, end_sec
+
+def trim_file(output_file, start_sec, end_sec, is_audio_only, inplace=False, total_sec=None):
+    """Cut a downloaded file with ffmpeg, re-encoding it for QuickTime.
+    
+    With inplace=True the trimmed file replaces the download instead of
+    being saved next to it. total_sec is the length of the download, used
+    to report progress when trimming to the end.
+    """
+    base, extn = os.path.splitext(output_file)
+    trimmed_file = output_file if inplace else f"{base}_trimmed{extn}"
+    # ffmpeg picks the container from the extension, so keep it last
+    partial_file = f"{base}_trimmed.part{extn}"
+    
+    log("[trim]", f"✂️ Trimming {output_file} with QuickTime-compatible encoding...")
+    # Trims run in the background, so only let ffmpeg print errors
+    ffmpeg_cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-fflags", "+genpts"]
+    # Seeking before -i jumps straight to the start via the container index
+    # instead of decoding everything up to it
+    if start_sec is not None:
+        ffmpeg_cmd += ["-ss", str(start_sec)]
+    ffmpeg_cmd += ["-i", output_file]
+    if end_sec is not None:
+        if start_sec is not None:
+            duration_sec = end_sec - start_sec
+        else:
+            duration_sec = end_sec
+        ffmpeg_cmd += ["-t", str(duration_sec)]
+    elif total_sec:
+        duration_sec = total_sec - (start_sec or 0)
+    else:
+        duration_sec = None
+    if is_audio_only:
+        ffmpeg_cmd += ["-c:a", "aac", "-ar", "44100", "-profile:a", "aac_low", "-strict", "-2"]
+    else:
+        ffmpeg_cmd += [
+            "-map", "0:v:0?", "-map", "0:a:0?",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", "30",
+            "-c:a", "aac", "-ar", "44100", "-profile:a", "aac_low",
+            "-movflags", "+faststart", "-strict", "-2"
+        ]
+    # Have ffmpeg report how far it has got as key=value lines on stdout
+    ffmpeg_cmd += ["-progress", "pipe:1", "-nostats"]
+    # Write to a partial file and rename it when done, so an interrupted
+    # trim never leaves a truncated file under the final name
+    ffmpeg_cmd += [partial_file]
+    log("[trim]", f"Running: {shlex.join(ffmpeg_cmd)}")
+    try:
+        # Run ffmpeg outside the terminal's foreground process group, so the
+        # Ctrl+C that cancels downloads doesn't also kill trims in progress
+        if sys.platform == 'win32':
+            isolation = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            isolation = {'start_new_session': True}
+        with subprocess.Popen(ffmpeg_cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, text=True, **isolation) as proc:
+            report_trim_progress(proc.stdout, os.path.basename(output_file), duration_sec)
+        if proc.returncode:
+            raise subprocess.CalledProcessError(proc.returncode, ffmpeg_cmd)
+        os.replace(partial_file, trimmed_file)
+        log("[trim]", f"🎉 Trimmed file saved as: {trimmed_file} (should be compatible with QuickTime Player)")
+    except Exception as e:
+        log("[trim]", f"❌ Error trimming file: {e}")
+    finally:
+        # Only left behind if ffmpeg failed or was interrupted
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+
+def report_trim_progress(progress, name, duration_sec):
+    """Log ffmpeg's -progress output as steps of TRIM_PROGRESS_STEP percent.
+    
+    The trim thread shares the terminal with the URL prompt, so this logs
+    whole lines at a few milestones rather than redrawing a counter.
+    """
+    next_percent = TRIM_PROGRESS_STEP
+    for line in progress:
+        key, _, value = line.strip().partition('=')
+        # out_time_us is the position reached in the output, in microseconds
+        if key != 'out_time_us' or not duration_sec or not value.isdigit():
+            continue
+        percent = int(value) / 1_000_000 / duration_sec * 100
+        if percent >= next_percent and next_percent < 100:
+            log("[trim]", f"{name}: {int(percent // TRIM_PROGRESS_STEP * TRIM_PROGRESS_STEP)}%")
+            next_percent = (percent // TRIM_PROGRESS_STEP + 1) * TRIM_PROGRESS_STEP
+
+def trim_worker(trim_queue):
+    """Run queued trims one after another until a None job arrives."""
+    while True:
+        job = trim_queue.get()
+        try:
+            if job is None:
+                return
+            trim_file(*job)
+        finally:
+            trim_queue.task_done()
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Download videos or audio with yt-dlp')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_PARALLEL_DOWNLOADS,
+                        help=f'Number of URLs to download at the same time (default: {DEFAULT_PARALLEL_DOWNLOADS})')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="Show yt-dlp's debug output")
+    parser.add_argument('--inplace', action='store_true',
+                        help='Replace the downloaded file with the trimmed one instead of keeping both')
+    parser.add_argument('--aria2c', action='store_true',
+                        help="Download with aria2c (if installed); Ctrl+C then can't clean up partial files")
+    parser.add_argument('--thumbnail', action='store_true',
+                        help='Embed the video thumbnail in downloaded videos')
+    # Added by AutoVirtualEnvironment when the script re-executes itself
+    parser.add_argument('--venv-activated', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
 
 # Main script
 def main():
-    # Get the home directory for venv path
-    home_dir = str(Path.home())
-    
-    # Create venv name for this specific script
-    venv_name = os.path.join(home_dir, "venv", "ytdlp_venv")
+    args = parse_args()
     
-    # Setup auto virtual environment with required packages
-    auto_venv = AutoVirtualEnvironment(custom_name=venv_name, auto_packages=REQUIRED_PACKAGES)
+    # Use the venv shared by the py-utils scripts, adding this script's packages to it
+    auto_venv = AutoVirtualEnvironment(auto_packages=REQUIRED_PACKAGES, shared=True)
     
     # Try to switch to the virtual environment with required packages
     # This will create it if it doesn't exist and re-execute the script
@@ -85,8 +454,9 @@ def main():
     # If we reach here, we should be in the virtual environment
     print(f"Using Python interpreter: {sys.executable}")
     
-    # Import yt-dlp after ensuring it's installed
-    import yt_dlp
+    # yt-dlp takes a moment to import (it registers every extractor), so load it
+    # in the background while the user answers the prompts
+    threading.Thread(target=importlib.import_module, args=('yt_dlp',), daemon=True).start()
     
     # Proceed with the rest of the script
     print("\nYouTube Downloader")
@@ -114,194 +484,84 @@ def main():
     else:
         print("Video mode selected. All downloads will be saved as MP4.")
     
-    # Loop until user quits
-    while True:
-        # Get user input
-        url_input = input("\nEnter YouTube URL(s) (separate multiple URLs with commas, or 'q' to quit): ")
-        
-        # Check if user wants to quit
-        if url_input.lower() == 'q':
-            print("Exiting. Goodbye!")
-            break
-        
-        # Split the input by commas and strip whitespace
-        urls = [url.strip() for url in url_input.split(',') if url.strip()]
-        
-        if not urls:
-            print("No valid URLs entered. Please try again.")
-            continue
+    ydl_opts = build_ydl_opts(output_dir, is_audio_only, verbose=args.verbose, parallel=args.jobs > 1,
+                              thumbnail=args.thumbnail, aria2c=args.aria2c)
+    
+    # Trims run on their own thread, so ffmpeg works while the next URLs download
+    trim_queue = queue.Queue()
+    trimmer = threading.Thread(target=trim_worker, args=(trim_queue,), daemon=True)
+    trimmer.start()
+    
+    # Download several URLs at once; the threads and their YoutubeDL instances
+    # are kept for the whole session
+    with YoutubeDLPool(ydl_opts) as ydl_pool, ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        # Loop until user quits
+        while True:
+            # Get user input
+            url_input = input("\nEnter YouTube URL(s) (separate multiple URLs with commas, or 'q' to quit): ")
             
-        print(f"Found {len(urls)} URL(s) to process")
-        
-        # Process each URL
-        for index, url in enumerate(urls):
-            # Remove any @ symbol if present (sometimes added when copying from certain platforms)
-            url = url.lstrip('@')
+            # Check if user wants to quit
+            if url_input.lower() == 'q':
+                print("Exiting. Goodbye!")
+                break
             
-            if not url.startswith(('http://', 'https://', 'www.', 'youtu.be', 'youtube.com')):
-                print(f"\nSkipping invalid URL: {url}")
+            # Split the input by commas and strip whitespace
+            urls = [url.strip() for url in url_input.split(',') if url.strip()]
+            
+            if not urls:
+                print("No valid URLs entered. Please try again.")
                 continue
                 
-            print(f"\n[{index + 1}/{len(urls)}] Processing: {url}")
-            
-            # Set up yt-dlp options based on download type
-            if is_audio_only:
-                # Audio-only options
-                print("Audio-only mode selected. Will download as MP3.")
-                ydl_opts = {
-                    'format': 'bestaudio/best',
-                    'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }, {
-                        'key': 'FFmpegMetadata'  # Add metadata to the audio file
-                    }],
-                    'no_overwrites': True,
-                    'ignoreerrors': True,
-                    'verbose': True
-                }
-            else:
-                # Video options
-                print("Video mode selected. Will download as MP4.")
-                ydl_opts = {
-                    'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',  # Prefer MP4 format
-                    'merge_output_format': 'mp4',
-                    'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),  # Set output template to save in Downloads folder
-                    'embed_subs': True,
-                    'writethumbnail': True,
-                    'postprocessors': [
-                        {'key': 'FFmpegVideoConvertor', 'preferedformat': 'mp4'},  # Force MP4 conversion
-                        {'key': 'EmbedThumbnail'},  # Embed thumbnail in the video file
-                        {'key': 'FFmpegMetadata'},  # Add metadata to the video file
-                    ],
-                    'no_overwrites': True,
-                    'ignoreerrors': True,
-                    'verbose': True
-                }
+            print(f"Found {len(urls)} URL(s) to process")
             
-            # Run yt-dlp with the specified options
-            try:
-                print("\nAttempting to download...")
-                print(f"Download will be saved to: {output_dir}")
+            # Start downloading each valid URL
+            futures = {}
+            for index, url in enumerate(urls):
+                # Remove the @ sometimes added when copying from certain platforms
+                url = url.removeprefix('@')
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    # First try to get info to verify if video is accessible
-                    print("\nVerifying video access...")
-                    info = ydl.extract_info(url, download=False)
-                    print(f"Video title: {info.get('title', 'Unknown')}")
-                    print(f"Video duration: {info.get('duration', 'Unknown')} seconds")
-                    print(f"Available formats: {len(info.get('formats', []))} formats found")
-                    
-                    # Now download the video
-                    print("\nStarting download...")
-                    ydl.download([url])
-                
-                # Try to get the actual output file path
-                output_file = None
-                ext = 'mp3' if is_audio_only else 'mp4'
-                # Try yt-dlp info dict for output file path
-                if 'requested_downloads' in info and info['requested_downloads']:
-                    output_file = info['requested_downloads'][0].get('filepath')
-                elif 'filepath' in info:
-                    output_file = info['filepath']
-                # Fallback: search for the most recent file in output_dir with the right extension
-                if not output_file or not os.path.exists(output_file):
-                    import glob
-                    files = glob.glob(os.path.join(output_dir, f"*.{ext}"))
-                    if files:
-                        output_file = max(files, key=os.path.getmtime)
-                trimmed_file = None
-                if output_file:
-                    base, extn = os.path.splitext(output_file)
-                    trimmed_file = f"{base}_trimmed{extn}"
-                duration = info.get('duration', None)
+                if not URL_RE.match(url):
+                    print(f"\nSkipping invalid URL: {url}")
+                    continue
                 
-                # Prompt for trim times (after download)
-                if duration:
-                    if duration >= 3600:
-                        time_format = 'HH:MM:SS'
-                    else:
-                        time_format = 'MM:SS'
-                else:
-                    time_format = 'MM:SS'
-                print("\n✨ Optional: Trim your download! ✨")
-                print(f"Enter start and end times in {time_format} format (leave blank for full length). Example: 00:30 for 30 seconds, 01:15:00 for 1 hour 15 min.")
-                trim_start = input("⏩ Start at (leave blank for start): ").strip()
-                trim_end = input("⏹️ End at (leave blank for end): ").strip()
-                
-                def parse_time(t):
-                    if not t:
-                        return None
-                    parts = t.split(":")
-                    try:
-                        if len(parts) == 3:
-                            h, m, s = map(int, parts)
-                            return h*3600 + m*60 + s
-                        elif len(parts) == 2:
-                            m, s = map(int, parts)
-                            return m*60 + s
-                        elif len(parts) == 1:
-                            return int(parts[0])
-                    except Exception:
-                        return None
-                    return None
-                
-                start_sec = parse_time(trim_start)
-                end_sec = parse_time(trim_end)
-                
-                if (start_sec is not None or end_sec is not None):
-                    if not output_file or not os.path.exists(output_file):
-                        print(f"❌ Could not find the downloaded file to trim! Please check your downloads folder. (File: {output_file})")
-                    else:
-                        print(f"\n✂️ Trimming {output_file} with QuickTime-compatible encoding...")
-                        ffmpeg_cmd = [
-                            "ffmpeg", "-y", "-fflags", "+genpts", "-i", output_file
-                        ]
-                        if start_sec is not None:
-                            ffmpeg_cmd += ["-ss", str(start_sec)]
-                        if end_sec is not None:
-                            if start_sec is not None:
-                                duration_sec = end_sec - start_sec
-                            else:
-                                duration_sec = end_sec
-                            ffmpeg_cmd += ["-t", str(duration_sec)]
-                        if is_audio_only:
-                            ffmpeg_cmd += ["-c:a", "aac", "-ar", "44100", "-profile:a", "aac_low", "-strict", "-2"]
-                        else:
-                            ffmpeg_cmd += [
-                                "-map", "0:v:0?", "-map", "0:a:0?",
-                                "-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", "30",
-                                "-c:a", "aac", "-ar", "44100", "-profile:a", "aac_low",
-                                "-movflags", "+faststart", "-strict", "-2"
-                            ]
-                        ffmpeg_cmd += [trimmed_file]
-                        print(f"Running: {' '.join([f'\"{arg}\"' if ' ' in str(arg) else str(arg) for arg in ffmpeg_cmd])}")
-                        try:
-                            subprocess.run(ffmpeg_cmd, check=True)
-                            print(f"\n🎉 Trimmed file saved as: {trimmed_file}\n✅ This file should be compatible with QuickTime Player!")
-                        except Exception as e:
-                            print(f"❌ Error trimming file: {e}")
-                else:
-                    print("No trimming selected. Keeping full download.")
-            except yt_dlp.utils.DownloadError as e:
-                print(f"\nError downloading video: {e}")
-                if "members-only content" in str(e).lower() or "private video" in str(e).lower() or "This video is only available to members" in str(e):
-                    print("\nThis appears to be a members-only video which requires special access.")
-                    print("Unfortunately this content cannot be downloaded with this tool.")
-                elif "sign in to view" in str(e).lower():
-                    print("\nThis video requires you to be signed in to view.")
-                    print("Unfortunately this content cannot be downloaded with this tool.")
-            except Exception as e:
-                print(f"\nUnexpected error during download: {e}")
-                print(f"Error type: {type(e).__name__}")
+                label = f"[{index + 1}/{len(urls)}]"
+                futures[executor.submit(download_url, url, label, ydl_pool, output_dir)] = label
+            
+            # Report each download as soon as it finishes
+            results = {}
+            try:
+                for future in as_completed(futures):
+                    label = futures[future]
+                    results[label] = future.result()
+                    log(label, "Done." if results[label] else "Failed.")
             except KeyboardInterrupt:
-                print("\nDownload cancelled by user.")
-                print("Continuing to next URL...")
+                if cancel_downloads(futures):
+                    print("Exiting. Goodbye!")
+                    break
+                print("Download cancelled by user.")
                 continue
-                
-        print("\nProcessed all URLs.")
+            
+            # Ask about trimming one download at a time, in the order the URLs were
+            # entered, and queue the cuts for the trim thread
+            for label in futures.values():
+                if results[label]:
+                    info, output_file = results[label]
+                    try:
+                        trim_times = ask_trim(info, output_file)
+                    except KeyboardInterrupt:
+                        print("\nTrim cancelled by user.")
+                        print("Continuing to next URL...")
+                        continue
+                    if trim_times:
+                        trim_queue.put((output_file, *trim_times, is_audio_only, args.inplace, info.get('duration')))
+                    
+            print("\nProcessed all URLs.")
+    
+    # Let queued trims finish before exiting
+    if trim_queue.unfinished_tasks:
+        print("Waiting for trims to finish...")
+    trim_queue.put(None)
+    trimmer.join()
 
 if __name__ == "__main__":
     main()